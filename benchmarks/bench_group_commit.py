@@ -0,0 +1,84 @@
+"""
+Сравнение групповой фиксации (WAL + один fsync на группу) с fsync на каждую запись.
+
+Запуск: PYTHONPATH=. python benchmarks/bench_group_commit.py [кол-во записей] [параллельность]
+"""
+import os
+import sys
+import time
+import asyncio
+import tempfile
+import statistics
+from src.states import UserRecord
+from src.wal import GroupCommitWriter, OP_REPLACE
+
+
+WINDOW = 0.005
+
+
+def write_with_fsync(path: str, payload: bytes) -> None:
+    """Атомарно записывает файл с fsync (текущий путь без группировки)."""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(payload)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+async def run(save, writes: int, concurrency: int) -> tuple:
+    """Выполняет записи из `concurrency` параллельных обработчиков, возвращает пропускную способность и задержки."""
+    latencies = []
+    payload = UserRecord(1, 'male', 80, 180, 30, 3, 'Москва', 2500, 2800, 0, 0, 0).pack()
+
+    async def worker(worker_id: int) -> None:
+        for i in range(writes // concurrency):
+            start = time.perf_counter()
+            await save(f'{worker_id}.bin', payload)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(worker_id) for worker_id in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000
+    )
+
+
+async def main() -> None:
+    writes = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    with tempfile.TemporaryDirectory() as root:
+        async def save_fsync(path: str, payload: bytes) -> None:
+            await asyncio.to_thread(write_with_fsync, os.path.join(root, path), payload)
+
+        fsync_result = await run(save_fsync, writes, concurrency)
+
+    with tempfile.TemporaryDirectory() as root:
+        writer = GroupCommitWriter(
+            root=root,
+            wal_path=os.path.join(root, 'wal.log'),
+            window=WINDOW,
+            checkpoint_bytes=4 * 1024 * 1024
+        )
+
+        async def save_group(path: str, payload: bytes) -> None:
+            await writer.write([(OP_REPLACE, path, payload)])
+
+        group_result = await run(save_group, writes, concurrency)
+        await writer.close()
+        group_size = writer.records / writer.commits
+
+    print(f'Записей: {writes}, параллельных обработчиков: {concurrency}')
+    print(f'fsync на запись:      {fsync_result[0]:8.0f} зап/с, p50 {fsync_result[1]:6.1f} мс, p99 {fsync_result[2]:6.1f} мс')
+    print(f'групповая фиксация:   {group_result[0]:8.0f} зап/с, p50 {group_result[1]:6.1f} мс, p99 {group_result[2]:6.1f} мс')
+    print(f'Средний размер группы: {group_size:.1f} записей на fsync')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
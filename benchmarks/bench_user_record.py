@@ -0,0 +1,63 @@
+"""
+Сравнение UserState (pydantic + JSON) и UserRecord (__slots__ + struct)
+по памяти на миллион закэшированных профилей и по скорости декодирования.
+
+Запуск: PYTHONPATH=. python benchmarks/bench_user_record.py
+"""
+import json
+import time
+import tracemalloc
+from src.states import UserState, UserRecord
+
+
+N = 100_000
+PROFILE = {
+    'user_id': 123456789,
+    'sex': 'male',
+    'weight': 80,
+    'height': 180,
+    'age': 30,
+    'activity_level': 3,
+    'city': 'Москва',
+    'calorie_goal': 2500,
+    'water_goal': 2800,
+    'logged_water': 1200,
+    'logged_calories': 1400,
+    'burned_calories': 300
+}
+
+
+def measure_memory(factory) -> float:
+    """Возвращает объём памяти в МБ на миллион объектов."""
+    tracemalloc.start()
+    objects = [factory(i) for i in range(N)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return current / N * 1_000_000 / 2 ** 20
+
+
+def measure_throughput(decode, payload) -> float:
+    """Возвращает количество декодированных профилей в секунду."""
+    start = time.perf_counter()
+    for _ in range(N):
+        decode(payload)
+    return N / (time.perf_counter() - start)
+
+
+def main() -> None:
+    state_memory = measure_memory(lambda i: UserState(**{**PROFILE, 'user_id': i}))
+    record_memory = measure_memory(lambda i: UserRecord(**{**PROFILE, 'user_id': i}))
+
+    json_payload = json.dumps(PROFILE)
+    binary_payload = UserRecord(**PROFILE).pack()
+    state_rate = measure_throughput(lambda p: UserState(**json.loads(p)), json_payload)
+    record_rate = measure_throughput(UserRecord.unpack, binary_payload)
+
+    print(f'Размер на диске: JSON {len(json_payload.encode())} Б, binary {len(binary_payload)} Б')
+    print(f'Память на 1 млн: UserState {state_memory:.0f} МБ, UserRecord {record_memory:.0f} МБ')
+    print(f'Декодирование: JSON+pydantic {state_rate:,.0f}/с, struct {record_rate:,.0f}/с')
+
+
+if __name__ == '__main__':
+    main()
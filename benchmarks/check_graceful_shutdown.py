@@ -0,0 +1,196 @@
+"""
+Проверка корректного завершения бота по SIGTERM под нагрузкой.
+
+Бот запускается в дочернем процессе через src.bot.main() с заглушкой вместо
+сессии Bot API: первый getUpdates возвращает пачку команд '/log_water',
+ответы на сообщения отправляются с задержкой, чтобы обработчики оставались
+в работе. Как только обновления выданы, родительский процесс отправляет
+SIGTERM и после завершения бота сверяет сохранённые на диске суммы воды
+и журналы событий с числом отправленных команд.
+
+Запуск: PYTHONPATH=. python benchmarks/check_graceful_shutdown.py [пользователей] [команд на пользователя]
+"""
+import os
+import sys
+import time
+import signal
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+
+DEFAULT_USERS = 50
+DEFAULT_COMMANDS = 4
+WATER_AMOUNT = 100
+# Задержка ответа Bot API: обработчики должны быть в работе в момент SIGTERM
+REPLY_DELAY = 0.2
+EXIT_TIMEOUT = 30
+
+PROFILE = {
+    'sex': 'female',
+    'weight': 60,
+    'height': 170,
+    'age': 30,
+    'activity_level': 3,
+    'city': 'Москва',
+    'calorie_goal': 2000,
+    'water_goal': 2500,
+    'logged_water': 0,
+    'logged_calories': 0,
+    'burned_calories': 0
+}
+
+
+def configure_environment(data_dir: str) -> None:
+    """Направляет хранилище во временную директорию и задаёт обязательные настройки."""
+    os.environ['PYTHONPATH'] = data_dir
+    for name in ('NUTRITIONIX_ID', 'NUTRITIONIX_TOKEN', 'APININJAS_TOKEN', 'OPENWEATHERMAP_TOKEN'):
+        os.environ.setdefault(name, 'test')
+    os.environ['TELEGRAM_TOKEN'] = '42:TEST'
+    os.environ.pop('TELEGRAM_TOKENS', None)
+    os.environ.pop('PRIMARY_BOT_ID', None)
+
+
+async def run_bot(users: int, commands: int) -> None:
+    """Запускает бота с заглушкой Bot API и работает до SIGTERM."""
+    from aiogram.methods import GetMe, GetUpdates, SendMessage
+    from aiogram.types import Chat, Message, Update, User
+
+    from src import bot
+    from src.states import UserRecord
+    from src.storage import recover_storage, save_user_data
+
+    recover_storage()
+    for user_id in range(1, users + 1):
+        await save_user_data(user_data=UserRecord(user_id=user_id, **PROFILE))
+
+    state = {'delivered': False, 'replies': 0}
+
+    async def make_request(_, method, timeout=None):
+        if isinstance(method, GetMe):
+            return User(id=42, is_bot=True, first_name='Test', username='test_bot')
+
+        if isinstance(method, GetUpdates):
+            if state['delivered']:
+                try:
+                    await asyncio.sleep(3600)
+                except asyncio.CancelledError:
+                    print(f'replies_at_stop={state["replies"]}', flush=True)
+                    raise
+
+            updates = []
+            for command in range(commands):
+                for user_id in range(1, users + 1):
+                    sender = User(id=user_id, is_bot=False, first_name='User')
+                    updates.append(Update(
+                        update_id=len(updates) + 1,
+                        message=Message(
+                            message_id=command + 1,
+                            date=int(time.time()),
+                            chat=Chat(id=user_id, type='private'),
+                            from_user=sender,
+                            text=f'/log_water {WATER_AMOUNT}'
+                        )
+                    ))
+
+            state['delivered'] = True
+            print('delivered', flush=True)
+            return updates
+
+        if isinstance(method, SendMessage):
+            await asyncio.sleep(REPLY_DELAY)
+            state['replies'] += 1
+            return Message(
+                message_id=state['replies'],
+                date=int(time.time()),
+                chat=Chat(id=method.chat_id, type='private'),
+                text=method.text
+            )
+
+        return True
+
+    bot.session.make_request = make_request
+
+    # Погода и внешние API проверке не нужны
+    async def idle(**_) -> None:
+        await asyncio.Event().wait()
+
+    bot.refresh_weather_cache = idle
+
+    await bot.main()
+    print(f'replies={state["replies"]}', flush=True)
+
+
+def verify(users: int, commands: int) -> list:
+    """Сверяет сохранённые суммы и журналы событий с отправленными командами."""
+    from src.storage import load_user_data, iter_events
+
+    errors = []
+    expected = commands * WATER_AMOUNT
+    for user_id in range(1, users + 1):
+        logged = load_user_data(user_id=user_id).logged_water
+        events = sum(1 for _ in iter_events(user_id))
+        if logged != expected or events != commands:
+            errors.append(f'пользователь {user_id}: вода {logged} из {expected}, событий {events} из {commands}')
+
+    return errors
+
+
+def main() -> None:
+    data_dir = tempfile.mkdtemp(prefix='shutdown-')
+    try:
+        check(data_dir)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def check(data_dir: str) -> None:
+    """Запускает бота в дочернем процессе, останавливает его по SIGTERM и сверяет результат."""
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_USERS
+    commands = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_COMMANDS
+
+    env = {**os.environ, 'SHUTDOWN_CHECK_CHILD': data_dir}
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), str(users), str(commands)],
+        env=env,
+        stdout=subprocess.PIPE,
+        text=True
+    )
+
+    for line in child.stdout:
+        if line.strip() == 'delivered':
+            break
+    else:
+        sys.exit(f'Бот завершился до получения обновлений, код {child.wait()}')
+
+    child.send_signal(signal.SIGTERM)
+    try:
+        output, _ = child.communicate(timeout=EXIT_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        child.kill()
+        sys.exit(f'Бот не завершился за {EXIT_TIMEOUT} с после SIGTERM')
+
+    results = dict(line.split('=', 1) for line in output.split() if '=' in line)
+    print(f'Команд: {users * commands}, ответов к моменту SIGTERM: {results.get("replies_at_stop")}, '
+          f'всего ответов: {results.get("replies")}, код возврата: {child.returncode}')
+
+    if child.returncode != 0:
+        sys.exit(f'Бот завершился с кодом {child.returncode}')
+    if int(results.get('replies_at_stop', users * commands)) >= users * commands:
+        sys.exit('SIGTERM пришёл после обработки всех команд: увеличьте число пользователей или команд')
+
+    configure_environment(data_dir)
+    errors = verify(users, commands)
+    if errors:
+        sys.exit('Потеряны увеличения прогресса:\n' + '\n'.join(errors[:20]))
+
+    print('Все увеличения сохранены.')
+
+
+if __name__ == '__main__':
+    if 'SHUTDOWN_CHECK_CHILD' in os.environ:
+        configure_environment(os.environ['SHUTDOWN_CHECK_CHILD'])
+        asyncio.run(run_bot(int(sys.argv[1]), int(sys.argv[2])))
+    else:
+        main()
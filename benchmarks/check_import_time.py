@@ -0,0 +1,92 @@
+"""
+Проверка времени импорта src.bot через `python -X importtime`.
+
+Импорт повторяется несколько раз, берётся лучшее время (как в timeit). Бюджет —
+базовое значение из benchmarks/baselines.json плюс небольшой запас. Проверка
+завершается с ненулевым кодом, если бюджет превышен либо при старте загружаются
+модули, которые должны импортироваться лениво.
+
+Запуск:
+    PYTHONPATH=. python benchmarks/check_import_time.py               # сравнение с базовым значением
+    PYTHONPATH=. python benchmarks/check_import_time.py --save        # сохранение нового базового значения
+    PYTHONPATH=. python benchmarks/check_import_time.py --margin 10   # запас бюджета в процентах
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+# Случай в baselines.json, общем с benchmarks/run.py
+BASELINE_CASE = 'import.src_bot'
+DEFAULT_MARGIN = 25.0
+DEFAULT_REPEAT = 5
+LAZY_MODULES = ('googletrans', 'httpx', 'h2')
+
+
+def measure_import_time(module: str) -> dict:
+    """Возвращает накопленное время импорта (мкс) для каждого загруженного модуля."""
+    env = {'TELEGRAM_TOKEN': '1:budget', **os.environ}
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Проверка времени импорта src.bot')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT, help='Повторов импорта, берётся лучший')
+    parser.add_argument('--margin', type=float, default=DEFAULT_MARGIN, metavar='PERCENT',
+                        help='Запас бюджета относительно базового значения в процентах')
+    parser.add_argument('--save', action='store_true', help='Сохранить результат как базовый')
+    args = parser.parse_args()
+
+    timings = min((measure_import_time('src.bot') for _ in range(args.repeat)), key=lambda item: item['src.bot'])
+    total_ms = timings['src.bot'] / 1000
+
+    eager = [module for module in LAZY_MODULES if module in timings]
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:10]
+
+    with open(BASELINES_PATH, 'r', encoding='UTF-8') as file:
+        saved = json.load(file)
+    baseline = saved['results'].get(BASELINE_CASE)
+
+    if baseline is None:
+        print(f'Время импорта src.bot: {total_ms:.0f} мс (базового значения нет)')
+    else:
+        budget_ms = baseline['total_ms'] * (1 + args.margin / 100)
+        print(f'Время импорта src.bot: {total_ms:.0f} мс (база {baseline["total_ms"]:.0f} мс, бюджет {budget_ms:.0f} мс)')
+    for name, cumulative in slowest:
+        print(f'  {cumulative / 1000:8.1f} мс  {name}')
+
+    if args.save:
+        saved['results'][BASELINE_CASE] = {'total_ms': round(total_ms)}
+        with open(BASELINES_PATH, 'w', encoding='UTF-8') as file:
+            json.dump(saved, file, ensure_ascii=False, indent=2)
+            file.write('\n')
+        print(f'Базовое значение сохранено: {BASELINES_PATH}')
+
+    if eager:
+        sys.exit(f'Модули должны импортироваться лениво: {", ".join(eager)}')
+    if baseline is None and not args.save:
+        sys.exit('Базовое значение не сохранено: запустите проверку с --save')
+    if baseline is not None and not args.save and total_ms > budget_ms:
+        sys.exit(f'Бюджет времени импорта превышен на {total_ms - budget_ms:.0f} мс')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Проверка гонки фоновой миграции плоской структуры users/<id>.bin с сохранением профилей.
+
+Для пользователей создаются устаревшие профили в плоской структуре, затем
+одновременно запускаются migrate_flat_layout (в потоке, как в боте) и сохранение
+новых профилей в шарды. После сброса кэша каждый профиль должен читаться
+в новой версии, а плоских файлов не должно остаться.
+
+Запуск: PYTHONPATH=. python benchmarks/check_migration_race.py [пользователей] [повторов]
+"""
+import os
+import sys
+import asyncio
+import tempfile
+
+
+DEFAULT_USERS = 2000
+DEFAULT_ROUNDS = 5
+OLD_WATER = 100
+NEW_WATER = 2000
+
+
+async def run_round(storage, UserRecord, user_ids: range) -> list:
+    """Выполняет один прогон: миграция в потоке параллельно с сохранениями."""
+    for user_id in user_ids:
+        with open(storage._flat_user_path(user_id, 'bin'), 'wb') as file:
+            file.write(UserRecord(user_id, 'male', 80, 180, 30, 3, 'Москва', 2500, 2800, OLD_WATER, 0, 0).pack())
+
+    # Первый пользователь обновляет профиль до миграции, остальные — во время неё
+    first = UserRecord(user_ids[0], 'male', 80, 180, 30, 3, 'Москва', 2500, 2800, NEW_WATER, 0, 0)
+    await storage.save_user_data(user_data=first)
+
+    migration = asyncio.create_task(asyncio.to_thread(storage.migrate_flat_layout))
+    await asyncio.gather(*(
+        storage.save_user_data(
+            user_data=UserRecord(user_id, 'male', 80, 180, 30, 3, 'Москва', 2500, 2800, NEW_WATER, 0, 0)
+        )
+        for user_id in user_ids[1:]
+    ))
+    await migration
+
+    storage._user_cache.clear()
+    errors = []
+    for user_id in user_ids:
+        logged = storage.load_user_data(user_id=user_id).logged_water
+        if logged != NEW_WATER:
+            errors.append(f'пользователь {user_id}: вода {logged} вместо {NEW_WATER}')
+        if os.path.exists(storage._flat_user_path(user_id, 'bin')):
+            errors.append(f'пользователь {user_id}: плоский файл не удалён')
+
+    return errors
+
+
+async def run(users: int, rounds: int) -> list:
+    """Выполняет несколько прогонов во временном хранилище."""
+    from src import storage
+    from src.states import UserRecord
+
+    storage.writer.window = 0
+    errors = []
+    for round_number in range(rounds):
+        # Каждый прогон работает со своими пользователями, чтобы шарды начинались пустыми
+        user_ids = range(round_number * users + 1, (round_number + 1) * users + 1)
+        errors += await run_round(storage, UserRecord, user_ids)
+
+    await storage.close_storage()
+
+    return errors
+
+
+def main() -> None:
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_USERS
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_ROUNDS
+
+    with tempfile.TemporaryDirectory(prefix='migration-') as data_dir:
+        # Хранилище пишет в PYTHONPATH/users, поэтому проверка работает во временной директории
+        os.environ['PYTHONPATH'] = data_dir
+        os.makedirs(os.path.join(data_dir, 'users'))
+        errors = asyncio.run(run(users, rounds))
+
+    print(f'Пользователей: {users}, прогонов: {rounds}, ошибок: {len(errors)}')
+    if errors:
+        sys.exit('Миграция затёрла новые профили:\n' + '\n'.join(errors[:20]))
+
+    print('Новые профили сохранены.')
+
+
+if __name__ == '__main__':
+    main()
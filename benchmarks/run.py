@@ -0,0 +1,306 @@
+"""
+Микробенчмарки кода, выполняемого на каждое сообщение: хранилище и сериализация
+профилей, расчёт норм и форматирование ответов.
+
+Для каждого случая измеряются задержка одного вызова (медиана и p95), пропускная
+способность пачки вызовов и объём памяти, выделяемой за вызов (пик tracemalloc);
+из нескольких повторов берётся лучшее значение.
+Результаты сравниваются с базовыми значениями из benchmarks/baselines.json.
+
+Запуск:
+    PYTHONPATH=. python benchmarks/run.py                # сравнение с базовыми значениями
+    PYTHONPATH=. python benchmarks/run.py --save         # сохранение новых базовых значений
+    PYTHONPATH=. python benchmarks/run.py --check 20     # код возврата 1 при регрессии больше 20 %
+    PYTHONPATH=. python benchmarks/run.py -k storage     # только случаи с подстрокой в имени
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import shutil
+import platform
+import tempfile
+import tracemalloc
+import statistics
+
+# Хранилище пишет в PYTHONPATH/users, поэтому бенчмарк работает во временной директории;
+# она удаляется по завершении main()
+DATA_DIR = tempfile.mkdtemp(prefix='bench-')
+os.environ['PYTHONPATH'] = DATA_DIR
+
+from src import storage
+from src.replies import format_food, format_progress, format_water, format_workout
+from src.states import UserState, UserRecord, Nutrients
+from src.utils import mifflin_st_jeor, calculate_water_intake
+
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines.json')
+
+PROFILE = {
+    'user_id': 123456789,
+    'sex': 'male',
+    'weight': 80,
+    'height': 180,
+    'age': 30,
+    'activity_level': 3,
+    'city': 'Москва',
+    'calorie_goal': 2500,
+    'water_goal': 2800,
+    'logged_water': 1200,
+    'logged_calories': 1400,
+    'burned_calories': 300
+}
+NUTRIENTS = Nutrients(calories=250, protein=12.5, fat=8.1, carbohydrates=30.2, fiber=2.0, sugar=5.5)
+
+
+def storage_cases(loop: asyncio.AbstractEventLoop) -> dict:
+    """Случаи хранилища: чтение из кэша и с диска, запись через групповой журнал."""
+    # Окно накопления исключается, чтобы измерять код записи, а не ожидание группы
+    storage.writer.window = 0
+    storage.recover_storage()
+
+    record = UserRecord(**PROFILE)
+    loop.run_until_complete(storage.save_user_data(user_data=record))
+    records = [UserRecord(**{**PROFILE, 'user_id': i}) for i in range(32)]
+
+    def load_from_disk():
+        storage._user_cache.clear()
+        return storage.load_user_data(user_id=PROFILE['user_id'])
+
+    async def save_batch():
+        await asyncio.gather(*(storage.save_user_data(user_data=item) for item in records))
+
+    return {
+        'storage.load_cached': lambda: storage.load_user_data(user_id=PROFILE['user_id']),
+        'storage.load_disk': load_from_disk,
+        'storage.save': lambda: loop.run_until_complete(storage.save_user_data(user_data=record)),
+        'storage.save_event': lambda: loop.run_until_complete(
+            storage.save_user_data(user_data=record, event=(storage.EVENT_FOOD, 250, NUTRIENTS))
+        ),
+        'storage.save_batch32': lambda: loop.run_until_complete(save_batch())
+    }
+
+
+def serialization_cases() -> dict:
+    """Случаи сериализации: бинарный формат и валидация JSON + pydantic на границе доверия."""
+    record = UserRecord(**PROFILE)
+    payload = record.pack()
+    json_payload = json.dumps(PROFILE)
+    state = UserState(**PROFILE)
+
+    return {
+        'states.pack': record.pack,
+        'states.unpack': lambda: UserRecord.unpack(payload),
+        'states.json_validate': lambda: UserState(**json.loads(json_payload)),
+        'states.from_state': lambda: UserRecord.from_state(state)
+    }
+
+
+def utils_cases() -> dict:
+    """Случаи расчёта норм и форматирования ответов."""
+    record = UserRecord(**PROFILE)
+
+    return {
+        'utils.mifflin_st_jeor': lambda: mifflin_st_jeor(
+            sex='male', weight=80, height=180, age=30, activity_level=3
+        ),
+        'utils.calculate_water_intake': lambda: calculate_water_intake(sex='female', weight=60, activity_level=3),
+        'replies.water': lambda: format_water(record, 250),
+        'replies.food': lambda: format_food(record, NUTRIENTS),
+        'replies.workout': lambda: format_workout(record, 300),
+        'replies.progress': lambda: format_progress(record)
+    }
+
+
+def measure(func, samples: int, duration: float) -> dict:
+    """
+    Измеряет задержку, пропускную способность и выделение памяти для функции.
+
+    Parameters
+    ----------
+    func : Callable
+        Функция без аргументов.
+    samples : int
+        Количество замеров задержки одного вызова.
+    duration : float
+        Длительность замера пропускной способности в секундах.
+
+    Returns
+    -------
+    dict
+        Метрики median_us, p95_us, ops_per_sec, alloc_bytes.
+    """
+    for _ in range(min(samples, 100)):
+        func()
+
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter_ns()
+        func()
+        timings.append(time.perf_counter_ns() - start)
+    timings.sort()
+
+    # Пачка подбирается так, чтобы накладные расходы цикла измерения были незаметны
+    batch = max(1, int(0.01 / max(statistics.median(timings) / 1e9, 1e-9)))
+    calls = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < duration:
+        for _ in range(batch):
+            func()
+        calls += batch
+
+    tracemalloc.start()
+    allocated = []
+    for _ in range(min(samples, 200)):
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        allocated.append(peak - before)
+    tracemalloc.stop()
+
+    return {
+        'median_us': round(statistics.median(timings) / 1000, 3),
+        'p95_us': round(timings[int(len(timings) * 0.95) - 1] / 1000, 3),
+        'ops_per_sec': round(calls / elapsed, 1),
+        'alloc_bytes': int(statistics.median(allocated))
+    }
+
+
+# Для каких метрик рост означает ухудшение
+HIGHER_IS_WORSE = {'median_us': True, 'p95_us': True, 'ops_per_sec': False, 'alloc_bytes': True}
+# Метрики, по которым --check считает регрессию; p95 и пропускная способность
+# сильнее зависят от фоновой нагрузки и выводятся для справки
+GATED_METRICS = ('median_us', 'alloc_bytes')
+
+
+def measure_best(func, samples: int, duration: float, repeat: int) -> dict:
+    """
+    Повторяет замер и берёт лучшее значение каждой метрики, отсекая фоновые помехи (как timeit).
+
+    Parameters
+    ----------
+    func : Callable
+        Функция без аргументов.
+    samples : int
+        Количество замеров задержки одного вызова.
+    duration : float
+        Длительность замера пропускной способности в секундах.
+    repeat : int
+        Количество повторов.
+
+    Returns
+    -------
+    dict
+        Лучшие значения метрик.
+    """
+    rounds = [measure(func, samples=samples, duration=duration) for _ in range(repeat)]
+
+    return {
+        metric: (min if higher_is_worse else max)(result[metric] for result in rounds)
+        for metric, higher_is_worse in HIGHER_IS_WORSE.items()
+    }
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> list:
+    """
+    Печатает отчёт сравнения с базовыми значениями.
+
+    Parameters
+    ----------
+    results : dict
+        Текущие результаты по случаям.
+    baselines : dict
+        Сохранённые результаты по случаям.
+    threshold : float
+        Порог изменения в процентах, начиная с которого изменение помечается.
+
+    Returns
+    -------
+    list
+        Имена случаев и метрик с регрессией больше порога.
+    """
+    regressions = []
+
+    print(f'{"случай":30} {"метрика":12} {"база":>12} {"сейчас":>12} {"изменение":>10}')
+    for name, metrics in results.items():
+        base = baselines.get(name)
+        for metric, value in metrics.items():
+            if base is None or not base.get(metric):
+                print(f'{name:30} {metric:12} {"—":>12} {value:>12} {"новый":>10}')
+                continue
+
+            change = (value - base[metric]) / base[metric] * 100
+            worse = change if HIGHER_IS_WORSE[metric] else -change
+            # Для выделения памяти разница меньше одного блока не считается регрессией
+            if worse > threshold and not (metric == 'alloc_bytes' and value - base[metric] < 64):
+                mark = '  регрессия' if metric in GATED_METRICS else '  хуже'
+                if metric in GATED_METRICS:
+                    regressions.append(f'{name}.{metric}')
+            elif worse < -threshold:
+                mark = '  улучшение'
+            else:
+                mark = ''
+            print(f'{name:30} {metric:12} {base[metric]:>12} {value:>12} {change:>+9.1f}%{mark}')
+
+    return regressions
+
+
+def main() -> None:
+    try:
+        run_benchmarks()
+    finally:
+        shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+def run_benchmarks() -> None:
+    parser = argparse.ArgumentParser(description='Микробенчмарки горячего пути бота')
+    parser.add_argument('-k', dest='pattern', default='', help='Подстрока имени случая')
+    parser.add_argument('--samples', type=int, default=2000, help='Замеров задержки на случай')
+    parser.add_argument('--duration', type=float, default=0.3, help='Секунд на замер пропускной способности')
+    parser.add_argument('--repeat', type=int, default=3, help='Повторов замера, берётся лучший')
+    parser.add_argument('--save', action='store_true', help='Сохранить результаты как базовые')
+    parser.add_argument('--check', type=float, default=None, metavar='PERCENT',
+                        help='Завершиться с кодом 1 при регрессии больше PERCENT процентов')
+    args = parser.parse_args()
+
+    loop = asyncio.new_event_loop()
+    cases = {**serialization_cases(), **utils_cases(), **storage_cases(loop)}
+
+    results = {}
+    for name, func in cases.items():
+        if args.pattern in name:
+            results[name] = measure_best(func, samples=args.samples, duration=args.duration, repeat=args.repeat)
+
+    loop.run_until_complete(storage.close_storage())
+    loop.close()
+
+    environment = {'python': platform.python_version(), 'machine': platform.machine(), 'system': platform.system()}
+
+    try:
+        with open(BASELINES_PATH, 'r', encoding='UTF-8') as file:
+            saved = json.load(file)
+    except FileNotFoundError:
+        saved = {'environment': environment, 'results': {}}
+
+    if saved['environment'] != environment:
+        print(f'Базовые значения сняты в другом окружении: {saved["environment"]}', file=sys.stderr)
+
+    regressions = compare(results, saved['results'], threshold=args.check or 10.0)
+
+    if args.save:
+        saved = {'environment': environment, 'results': {**saved['results'], **results}}
+        with open(BASELINES_PATH, 'w', encoding='UTF-8') as file:
+            json.dump(saved, file, ensure_ascii=False, indent=2)
+            file.write('\n')
+        print(f'Базовые значения сохранены: {BASELINES_PATH}')
+
+    if args.check is not None and regressions:
+        print(f'Регрессии: {", ".join(regressions)}', file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
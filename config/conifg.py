@@ -11,3 +11,95 @@ OPENWEATHERMAP_TOKEN = os.getenv('OPENWEATHERMAP_TOKEN')
 NUTRITIONIX_ID = os.getenv('NUTRITIONIX_ID')
 NUTRITIONIX_TOKEN = os.getenv('NUTRITIONIX_TOKEN')
 APININJAS_TOKEN = os.getenv('APININJAS_TOKEN')
+# Несколько ботов в одном процессе: токены через запятую
+TELEGRAM_TOKENS = [
+    token.strip() for token in os.getenv('TELEGRAM_TOKENS', TELEGRAM_TOKEN or '').split(',') if token.strip()
+]
+# id основного бота, профили которого хранятся в users/; по умолчанию — бот с токеном TELEGRAM_TOKEN.
+# Профили остальных ботов хранятся в users/tenants/<id бота>/ независимо от порядка токенов
+PRIMARY_BOT_ID = int(os.getenv('PRIMARY_BOT_ID')) if os.getenv('PRIMARY_BOT_ID') else None
+
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', '100000'))
+PHRASEBOOK_PATH = os.getenv('PHRASEBOOK_PATH', f'{PYTHONPATH}/users/phrasebook.jsonl')
+GROUP_COMMIT_WINDOW_MS = float(os.getenv('GROUP_COMMIT_WINDOW_MS', '5'))
+WAL_CHECKPOINT_BYTES = int(os.getenv('WAL_CHECKPOINT_BYTES', str(4 * 1024 * 1024)))
+# Индекс пользователей уплотняется, когда записей в нём вдвое больше, чем пользователей (и не меньше этого числа)
+INDEX_COMPACT_MIN_ENTRIES = int(os.getenv('INDEX_COMPACT_MIN_ENTRIES', '65536'))
+
+MAX_CONCURRENT_UPDATES = int(os.getenv('MAX_CONCURRENT_UPDATES', '32'))
+MAX_CHAT_QUEUE = int(os.getenv('MAX_CHAT_QUEUE', '5'))
+MAX_PENDING_UPDATES = int(os.getenv('MAX_PENDING_UPDATES', '1000'))
+METRICS_INTERVAL = int(os.getenv('METRICS_INTERVAL', '60'))
+SHUTDOWN_TIMEOUT = float(os.getenv('SHUTDOWN_TIMEOUT', '8'))
+
+FSM_SESSION_TTL = int(os.getenv('FSM_SESSION_TTL', '1800'))
+FSM_SWEEP_INTERVAL = int(os.getenv('FSM_SWEEP_INTERVAL', '60'))
+FSM_NUDGE = os.getenv('FSM_NUDGE', '1') == '1'
+
+DIAGNOSTICS_DIR = os.getenv('DIAGNOSTICS_DIR', f'{PYTHONPATH}/diagnostics')
+TRACE_SLOW_THRESHOLD_MS = float(os.getenv('TRACE_SLOW_THRESHOLD_MS', '1000'))
+
+WEATHER_TTL = int(os.getenv('WEATHER_TTL', '900'))
+WEATHER_REFRESH_MARGIN = int(os.getenv('WEATHER_REFRESH_MARGIN', '180'))
+WEATHER_REFRESH_INTERVAL = int(os.getenv('WEATHER_REFRESH_INTERVAL', '60'))
+# Город без обращений и пользователей дольше WEATHER_POPULARITY_TTL перестаёт обновляться;
+# города пользователей пересчитываются по хранилищу раз в WEATHER_RESEED_INTERVAL
+WEATHER_POPULARITY_TTL = int(os.getenv('WEATHER_POPULARITY_TTL', '86400'))
+WEATHER_RESEED_INTERVAL = int(os.getenv('WEATHER_RESEED_INTERVAL', '3600'))
+
+# Профилирование по запросу: администраторы (id через запятую) и параметры семплирования
+ADMIN_IDS = [int(user_id) for user_id in os.getenv('ADMIN_IDS', '').split(',') if user_id.strip()]
+PROFILE_DEFAULT_SECONDS = int(os.getenv('PROFILE_DEFAULT_SECONDS', '30'))
+PROFILE_MAX_SECONDS = int(os.getenv('PROFILE_MAX_SECONDS', '300'))
+PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '10'))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', '100'))
+
+# Отложенные записи еды и тренировок при недоступности внешних API
+DEFERRED_QUEUE_PATH = os.getenv('DEFERRED_QUEUE_PATH', f'{PYTHONPATH}/users/deferred.jsonl')
+LOOKUP_TIMEOUT = float(os.getenv('LOOKUP_TIMEOUT', '10'))
+DEFERRED_RETRY_INTERVAL = int(os.getenv('DEFERRED_RETRY_INTERVAL', '30'))
+DEFERRED_MAX_BACKOFF = int(os.getenv('DEFERRED_MAX_BACKOFF', '3600'))
+DEFERRED_MAX_ATTEMPTS = int(os.getenv('DEFERRED_MAX_ATTEMPTS', '12'))
+DEFERRED_BATCH_SIZE = int(os.getenv('DEFERRED_BATCH_SIZE', '20'))
+
+# Графики прогресса: процессы отрисовки и размер кэша
+CHART_WORKERS = int(os.getenv('CHART_WORKERS', '2'))
+CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', '10000'))
+
+
+REQUIRED_SETTINGS = (
+    'PYTHONPATH',
+    'TELEGRAM_TOKENS',
+    'OPENWEATHERMAP_TOKEN',
+    'NUTRITIONIX_ID',
+    'NUTRITIONIX_TOKEN',
+    'APININJAS_TOKEN'
+)
+
+
+def validate_config() -> None:
+    """
+    Проверяет, что все обязательные переменные окружения заданы, а токены ботов
+    имеют формат <id бота>:<секрет>.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    RuntimeError
+        Если какие-либо переменные окружения не заданы либо токен бота некорректен.
+    """
+    missing = [name for name in REQUIRED_SETTINGS if not globals()[name]]
+    if missing:
+        raise RuntimeError(f'Не заданы переменные окружения: {", ".join(missing)}')
+
+    # Сами токены в сообщение не попадают: указываются только их номера в TELEGRAM_TOKENS
+    malformed = []
+    for position, token in enumerate(TELEGRAM_TOKENS, start=1):
+        bot_id, _, secret = token.partition(':')
+        if not bot_id.isdigit() or not secret or any(char.isspace() for char in token):
+            malformed.append(str(position))
+    if malformed:
+        raise RuntimeError(f'Некорректный формат токенов бота (<id>:<секрет>), номера: {", ".join(malformed)}')
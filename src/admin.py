@@ -0,0 +1,378 @@
+"""
+Административные операции над хранилищем пользователей.
+
+Примеры запуска:
+    python -m src.admin stats
+    python -m src.admin export --format csv --output users.csv
+    python -m src.admin export --user-id 123456789
+    python -m src.admin import users.jsonl
+    python -m src.admin phrases list --kind food
+    python -m src.admin phrases prune --phrase "яблоко" --min-hits 2
+    python -m src.admin --tenant 987654321 stats
+
+Работающий бот держит блокировку users/storage.lock. Импорт (пишет через журнал
+групповой фиксации) и очистка словаря фраз (phrases prune) выполняются только при
+остановленном боте. Команды чтения (stats, export, phrases list) работают и при
+запущенном боте, но без восстановления журнала: профили, записанные ботом
+в последние миллисекунды, могут быть ещё не видны.
+"""
+import os
+import sys
+import csv
+import json
+import asyncio
+import argparse
+from itertools import islice
+from collections import Counter
+from multiprocessing import Pool
+from pydantic import ValidationError
+from src.phrasebook import phrasebook
+from src.states import UserState, UserRecord, RecordEncodeError
+from src.storage import (
+    iter_user_paths,
+    iter_events,
+    read_user_file,
+    load_user_data,
+    save_user_data,
+    lock_storage,
+    recover_storage,
+    close_storage,
+    use_tenant
+)
+
+
+FIELDS = list(UserRecord.__slots__)
+CHUNKSIZE = 256
+
+
+def parse_user_file(path: str) -> dict | None:
+    """
+    Читает профиль пользователя в рабочем процессе.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу профиля.
+
+    Returns
+    -------
+    dict | None
+        Поля профиля либо None, если файл повреждён или удалён.
+    """
+    try:
+        return read_user_file(path).to_dict()
+    except (OSError, ValueError, KeyError) as e:
+        print(f'Пропущен файл {path}: {e}', file=sys.stderr)
+        return None
+
+
+def validate_row(row: dict | str | None) -> dict | str | None:
+    """
+    Проверяет строку импорта моделью UserState в рабочем процессе.
+
+    Строка также кодируется в бинарный формат, чтобы значения, которые
+    UserState пропускает, а запись хранить не может, отклонялись здесь же.
+
+    Parameters
+    ----------
+    row : dict | str | None
+        Поля профиля (строка CSV), строка JSONL либо None для пустой строки.
+
+    Returns
+    -------
+    dict | str | None
+        Провалидированные поля профиля, текст ошибки либо None для пустой строки.
+    """
+    if row is None:
+        return None
+
+    try:
+        if isinstance(row, str):
+            row = json.loads(row)
+        fields = UserState(**row).model_dump()
+        UserRecord(**fields).pack()
+        return fields
+    except (ValidationError, RecordEncodeError, ValueError, TypeError) as e:
+        return str(e)
+
+
+def imap_windowed(pool: Pool, func, items, window: int, ordered: bool = True):
+    """
+    Применяет функцию к элементам в пуле процессов, ограничивая число элементов в работе.
+
+    Pool.imap забирает входные данные целиком и копит готовые результаты, пока
+    потребитель их не прочитает, поэтому при медленном потребителе (импорт с fsync)
+    в памяти оказывается весь вход. Здесь элементы отправляются окнами по window
+    штук, и следующее окно читается только после выдачи результатов предыдущего.
+
+    Parameters
+    ----------
+    pool : Pool
+        Пул рабочих процессов.
+    func : Callable
+        Функция одного аргумента, выполняемая в рабочем процессе.
+    items : Iterable
+        Входные элементы; читаются лениво.
+    window : int
+        Максимальное число элементов в работе.
+    ordered : bool
+        Сохранять порядок результатов внутри окна.
+
+    Yields
+    ------
+    Any
+        Результаты func.
+    """
+    imap = pool.imap if ordered else pool.imap_unordered
+    items = iter(items)
+
+    while batch := list(islice(items, window)):
+        yield from imap(func, batch, chunksize=CHUNKSIZE)
+
+
+def iter_users(pool: Pool, window: int):
+    """
+    Потоково читает все профили хранилища, распределяя разбор по процессам.
+
+    Parameters
+    ----------
+    pool : Pool
+        Пул рабочих процессов.
+    window : int
+        Максимальное число профилей в работе.
+
+    Yields
+    ------
+    dict
+        Поля профиля.
+    """
+    for user in imap_windowed(pool, parse_user_file, iter_user_paths(), window, ordered=False):
+        if user is not None:
+            yield user
+
+
+def cmd_stats(pool: Pool, window: int) -> None:
+    """
+    Выводит агрегированную статистику по пользователям.
+
+    Parameters
+    ----------
+    pool : Pool
+        Пул рабочих процессов.
+    window : int
+        Максимальное число профилей в работе.
+
+    Returns
+    -------
+    None
+    """
+    cities = Counter()
+    sexes = Counter()
+    totals = Counter()
+
+    for user in iter_users(pool, window):
+        cities[user['city'].strip().title()] += 1
+        sexes[user['sex']] += 1
+        for field in ('weight', 'age', 'calorie_goal', 'water_goal', 'logged_calories', 'logged_water'):
+            totals[field] += user[field]
+
+    count = sum(sexes.values())
+    print(f'Пользователей: {count}')
+    if not count:
+        return
+
+    print(f'Пол: {dict(sexes)}')
+    print(f'Средняя цель по калориям: {totals["calorie_goal"] / count:.0f} ккал')
+    print(f'Средняя цель по воде: {totals["water_goal"] / count:.0f} мл')
+    print(f'Средний вес: {totals["weight"] / count:.1f} кг')
+    print(f'Средний возраст: {totals["age"] / count:.1f} лет')
+    print('Города:')
+    for city, users in cities.most_common(20):
+        print(f'  {city}: {users}')
+
+
+def cmd_export(pool: Pool, window: int, output, export_format: str, user_id: int | None) -> None:
+    """
+    Выгружает профили в JSONL или CSV.
+
+    Parameters
+    ----------
+    pool : Pool
+        Пул рабочих процессов.
+    window : int
+        Максимальное число профилей в работе.
+    output : TextIO
+        Файл для записи.
+    export_format : str
+        Формат выгрузки ('jsonl' или 'csv').
+    user_id : int | None
+        Если указан, выгружается профиль и журнал событий одного пользователя.
+
+    Returns
+    -------
+    None
+    """
+    if user_id is not None:
+        try:
+            user = load_user_data(user_id=user_id).to_dict()
+        except FileNotFoundError:
+            sys.exit(f'Пользователь {user_id} не найден.')
+        events = [
+            dict(zip(('timestamp', 'kind', 'amount', 'protein', 'fat', 'carbohydrates', 'fiber', 'sugar'), event))
+            for event in iter_events(user_id=user_id)
+        ]
+        json.dump({'profile': user, 'events': events}, output, ensure_ascii=False, indent=2)
+        return
+
+    if export_format == 'csv':
+        writer = csv.DictWriter(output, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(iter_users(pool, window))
+    else:
+        for user in iter_users(pool, window):
+            output.write(json.dumps(user, ensure_ascii=False) + '\n')
+
+
+def cmd_import(pool: Pool, window: int, source) -> None:
+    """
+    Загружает профили из JSONL или CSV с валидацией UserState.
+
+    Parameters
+    ----------
+    pool : Pool
+        Пул рабочих процессов.
+    window : int
+        Максимальное число строк в работе.
+    source : TextIO
+        Файл с профилями; формат определяется по расширению (.csv или JSONL).
+
+    Returns
+    -------
+    None
+    """
+    if source.name.endswith('.csv'):
+        rows = csv.DictReader(source)
+    else:
+        # Строки разбираются в рабочих процессах, чтобы ошибки JSON сообщались по номеру строки
+        rows = (line if line.strip() else None for line in source)
+
+    imported = 0
+    failed = 0
+    batch = []
+
+    async def save_batch(records: list) -> None:
+        # Профили одной пачки фиксируются одной группой записи
+        await asyncio.gather(*(save_user_data(user_data=record) for record in records))
+
+    for line_number, result in enumerate(imap_windowed(pool, validate_row, rows, window), start=1):
+        if result is None:
+            continue
+        if isinstance(result, str):
+            failed += 1
+            print(f'Строка {line_number} пропущена: {result}', file=sys.stderr)
+            continue
+
+        batch.append(UserRecord(**result))
+        if len(batch) >= CHUNKSIZE:
+            asyncio.run(save_batch(batch))
+            imported += len(batch)
+            batch = []
+
+    if batch:
+        asyncio.run(save_batch(batch))
+        imported += len(batch)
+
+    asyncio.run(close_storage())
+
+    print(f'Импортировано: {imported}, с ошибками: {failed}')
+
+
+def cmd_phrases_list(kind: str | None, limit: int) -> None:
+    """
+    Выводит записи словаря фраз, отсортированные по числу обращений.
+
+    Parameters
+    ----------
+    kind : str | None
+        Тип записей ('food' или 'workout'); None — все.
+    limit : int
+        Максимальное количество записей.
+
+    Returns
+    -------
+    None
+    """
+    entries = sorted(
+        (entry for (entry_kind, _), entry in phrasebook.entries.items() if kind is None or entry_kind == kind),
+        key=lambda entry: entry['hits'],
+        reverse=True
+    )
+
+    for entry in entries[:limit]:
+        unit = f' / {entry["unit"]}' if entry['unit'] else ''
+        print(f'{entry["hits"]:6d}  [{entry["kind"]}] {entry["phrase"]} -> {entry["english"]}  {entry["values"]}{unit}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Администрирование хранилища пользователей')
+    parser.add_argument('--workers', type=int, default=None, help='Количество рабочих процессов')
+    parser.add_argument('--tenant', default='', help='id дополнительного бота; по умолчанию — основной бот')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('stats', help='Статистика по пользователям')
+
+    export_parser = subparsers.add_parser('export', help='Выгрузка профилей')
+    export_parser.add_argument('--format', choices=('jsonl', 'csv'), default='jsonl')
+    export_parser.add_argument('--output', type=argparse.FileType('w', encoding='UTF-8'), default=sys.stdout)
+    export_parser.add_argument('--user-id', type=int, default=None)
+
+    import_parser = subparsers.add_parser('import', help='Загрузка профилей')
+    import_parser.add_argument('source', type=argparse.FileType('r', encoding='UTF-8'))
+
+    phrases_parser = subparsers.add_parser('phrases', help='Словарь выученных фраз')
+    phrases_subparsers = phrases_parser.add_subparsers(dest='phrases_command', required=True)
+    list_parser = phrases_subparsers.add_parser('list', help='Просмотр словаря')
+    list_parser.add_argument('--kind', choices=('food', 'workout'), default=None)
+    list_parser.add_argument('--limit', type=int, default=100)
+    prune_parser = phrases_subparsers.add_parser('prune', help='Удаление ошибочных записей')
+    prune_parser.add_argument('--kind', choices=('food', 'workout'), default=None)
+    prune_parser.add_argument('--phrase', action='append', default=[])
+    prune_parser.add_argument('--min-hits', type=int, default=None)
+
+    args = parser.parse_args()
+
+    if args.command == 'phrases':
+        if args.phrases_command == 'list':
+            cmd_phrases_list(args.kind, args.limit)
+        else:
+            # Бот держит словарь в памяти и при остановке записал бы удалённые записи обратно
+            if not lock_storage(blocking=False):
+                sys.exit('Бот запущен: очистка словаря возможна только при остановленном боте.')
+            removed = phrasebook.prune(kind=args.kind, phrases=args.phrase, min_hits=args.min_hits)
+            print(f'Удалено записей: {removed}')
+        return
+
+    # Журнал воспроизводится только при остановленном боте: иначе восстановление обрезало бы
+    # события, дописанные ботом после чтения журнала, и очистило бы журнал, нужный боту
+    if lock_storage(blocking=False):
+        recover_storage()
+    elif args.command == 'import':
+        sys.exit('Бот запущен: импорт возможен только при остановленном боте.')
+    else:
+        print('Бот запущен: записи из журнала, ещё не перенесённые в файлы, не учитываются.', file=sys.stderr)
+
+    workers = args.workers or os.cpu_count() or 1
+    # В работе не больше одного пакета на процесс, поэтому память не зависит от размера хранилища
+    window = CHUNKSIZE * workers
+
+    with Pool(processes=workers) as pool, use_tenant(args.tenant):
+        if args.command == 'stats':
+            cmd_stats(pool, window)
+        elif args.command == 'export':
+            cmd_export(pool, window, args.output, args.format, args.user_id)
+        elif args.command == 'import':
+            cmd_import(pool, window, args.source)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,270 @@
+import signal
 import asyncio
 from aiogram import Bot, Dispatcher
-from config.conifg import TELEGRAM_TOKEN
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramAPIError
+from config.conifg import (
+    validate_config,
+    TELEGRAM_TOKEN,
+    TELEGRAM_TOKENS,
+    PRIMARY_BOT_ID,
+    OPENWEATHERMAP_TOKEN,
+    MAX_CONCURRENT_UPDATES,
+    MAX_CHAT_QUEUE,
+    MAX_PENDING_UPDATES,
+    METRICS_INTERVAL,
+    SHUTDOWN_TIMEOUT,
+    FSM_SESSION_TTL,
+    FSM_SWEEP_INTERVAL,
+    FSM_NUDGE,
+    PROFILE_DEFAULT_SECONDS
+)
 from src.handlers import (
+    admin_router,
     general_router,
+    inline_router,
     logging_router,
     parameters_router
 )
-from src.middlewares import logger, LoggingMiddleware
+from src.charts import close_charts
+from src.deferred import deferred_queue, resolve_deferred
+from src.fsm import TTLMemoryStorage
+from src.middlewares import (
+    logger,
+    LoggingMiddleware,
+    TracingRequestMiddleware,
+    TenantMiddleware,
+    DuplicateCommandMiddleware,
+    SchedulerMiddleware
+)
+from src.phrasebook import phrasebook
+from src.profiler import profiler, format_summary
+from src.states import PARAMETERS_STEPS
+from src.storage import migrate_flat_layout, lock_storage, recover_storage, close_storage
+from src.utils import refresh_weather_cache, close_session
+
 
+# Все боты процесса используют одну HTTP-сессию Bot API, общие кэши и хранилище;
+# профили дополнительных ботов хранятся в отдельных пространствах имён.
+# Боты создаются в main() после проверки настроек (см. create_bots)
+session = AiohttpSession()
+session.middleware(TracingRequestMiddleware())
+bots = []
+bots_by_id = {}
+tenants = TenantMiddleware(tenants={})
+scheduler = SchedulerMiddleware(
+    max_concurrency=MAX_CONCURRENT_UPDATES,
+    max_chat_queue=MAX_CHAT_QUEUE,
+    max_pending=MAX_PENDING_UPDATES
+)
 
-bot = Bot(token=TELEGRAM_TOKEN)
+fsm_storage = TTLMemoryStorage()
 
-dp = Dispatcher()
+dp = Dispatcher(storage=fsm_storage)
+dp.update.outer_middleware(tenants)
+dp.update.outer_middleware(DuplicateCommandMiddleware(commands=('/log_food', '/log_workout')))
+dp.update.outer_middleware(scheduler)
+dp.include_router(admin_router)
 dp.include_router(general_router)
 dp.include_router(parameters_router)
 dp.include_router(logging_router)
+dp.include_router(inline_router)
 dp.message.middleware(LoggingMiddleware())
 
+# Фоновые задачи, которые останавливаются при завершении работы; обработчики получают
+# их через аргумент background_tasks
+background_tasks = set()
+dp['background_tasks'] = background_tasks
+
+
+def create_bots() -> int | None:
+    """
+    Создаёт ботов по токенам из настроек и распределяет их по пространствам имён.
+
+    Пространство имён определяется id бота, а не позицией токена в списке: иначе после
+    перестановки токенов другой бот получил бы профили из users/.
+
+    Returns
+    --------
+    int | None
+        id основного бота (профили в users/) либо None, если он не запущен.
+    """
+    bots.extend(Bot(token=token, session=session) for token in TELEGRAM_TOKENS)
+    bots_by_id.update((bot.id, bot) for bot in bots)
+
+    primary_bot_id = PRIMARY_BOT_ID or next((bot.id for bot in bots if bot.token == TELEGRAM_TOKEN), None)
+    tenants.tenants.update((bot.id, '' if bot.id == primary_bot_id else str(bot.id)) for bot in bots)
+
+    return primary_bot_id
+
+
+async def migrate_storage() -> None:
+    """
+    Переносит профили из плоской структуры users/ в шарды, не блокируя бота.
+
+    Returns
+    --------
+    None
+    """
+    migrated = await asyncio.to_thread(migrate_flat_layout)
+    if migrated:
+        logger.info(f'Перенесено профилей в шарды: {migrated}')
+
+
+async def report_metrics() -> None:
+    """
+    Периодически пишет в лог метрики очередей обработки обновлений.
+
+    Returns
+    --------
+    None
+    """
+    while True:
+        await asyncio.sleep(METRICS_INTERVAL)
+        logger.info(f'Метрики планировщика: {scheduler.metrics()}')
+        logger.info(f'Метрики FSM-сессий: {fsm_storage.metrics()}')
+        logger.info(f'Метрики ботов: {tenants.metrics()}')
+        logger.info(f'Отложенных записей в очереди: {len(deferred_queue)}')
+
+
+async def evict_fsm_sessions() -> None:
+    """
+    Периодически удаляет брошенные сессии настройки профиля и напоминает о них пользователям.
+
+    Returns
+    --------
+    None
+    """
+    while True:
+        await asyncio.sleep(FSM_SWEEP_INTERVAL)
+
+        evicted = fsm_storage.evict_idle(ttl=FSM_SESSION_TTL)
+        if evicted:
+            logger.info(f'Удалено неактивных FSM-сессий: {len(evicted)}')
+
+        if not FSM_NUDGE:
+            continue
+
+        for key, state in evicted:
+            step = PARAMETERS_STEPS.get(state)
+            bot = bots_by_id.get(key.bot_id)
+            if step is None or bot is None:
+                continue
+            try:
+                await bot.send_message(
+                    chat_id=key.chat_id,
+                    text=(
+                        f'Вы остановились на шаге «{step}» настройки профиля.\n'
+                        'Чтобы продолжить, начните заново: /set_profile'
+                    )
+                )
+            except TelegramAPIError as e:
+                logger.warning(f'Не удалось отправить напоминание в чат {key.chat_id}: {e}')
+
+
+async def notify_user(bot_id: int, chat_id: int, text: str) -> None:
+    """
+    Отправляет пользователю уведомление от имени бота, получившего исходный запрос.
+
+    Parameters
+    ----------
+    bot_id : int
+        id бота.
+    chat_id : int
+        Чат пользователя.
+    text : str
+        Текст уведомления.
+
+    Returns
+    --------
+    None
+    """
+    bot = bots_by_id.get(bot_id)
+    if bot is None:
+        logger.warning(f'Бот {bot_id} не запущен, уведомление в чат {chat_id} не отправлено')
+        return
+
+    try:
+        await bot.send_message(chat_id=chat_id, text=text)
+    except TelegramAPIError as e:
+        logger.warning(f'Не удалось отправить уведомление в чат {chat_id}: {e}')
+
+
+async def log_profile(task: asyncio.Task) -> None:
+    """
+    Дожидается окончания профилирования, запущенного сигналом, и пишет сводку в лог.
+
+    Parameters
+    ----------
+    task : asyncio.Task
+        Задача профилирования.
+
+    Returns
+    --------
+    None
+    """
+    try:
+        summary = await task
+    except Exception as e:
+        logger.warning(f'Профилирование завершилось ошибкой: {e!r}')
+        return
+
+    logger.info(format_summary(summary))
+
+
+def profile_on_signal() -> None:
+    """
+    Запускает профилирование по сигналу SIGUSR1 (kill -USR1 <pid> в контейнере).
+
+    Returns
+    --------
+    None
+    """
+    if profiler.running:
+        logger.warning('Профилирование уже запущено, сигнал пропущен')
+        return
+
+    logger.info(f'Профилирование запущено по сигналу на {PROFILE_DEFAULT_SECONDS} с')
+    task = profiler.start(PROFILE_DEFAULT_SECONDS)
+    for background_task in (task, asyncio.create_task(log_profile(task))):
+        background_tasks.add(background_task)
+        background_task.add_done_callback(background_tasks.discard)
+
+
+async def on_shutdown() -> None:
+    """
+    Корректно завершает работу бота после остановки polling.
+
+    Останавливает фоновые задачи, дожидается обработки уже принятых обновлений
+    (не уложившиеся в SHUTDOWN_TIMEOUT отменяются), сбрасывает хранилище и закрывает HTTP-сессию и FSM-хранилище.
+
+    Returns
+    --------
+    None
+    """
+    logger.info('Остановка бота: завершение обработки текущих обновлений.')
+
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    unfinished = await scheduler.drain(timeout=SHUTDOWN_TIMEOUT)
+    if unfinished:
+        logger.warning(f'Не успели обработать обновлений: {unfinished}, их обработка отменена')
+        # Хранилище закрывается только после того, как отменённые обработчики завершились
+        await scheduler.cancel()
+
+    close_charts()
+    await close_storage()
+    await asyncio.to_thread(phrasebook.save)
+    await close_session()
+    await dp.storage.close()
+
+    logger.info('Бот остановлен.')
+
+
+dp.shutdown.register(on_shutdown)
+
 
 async def main() -> None:
     """
@@ -26,8 +274,33 @@ async def main() -> None:
     --------
     None
     """
+    validate_config()
+    primary_bot_id = create_bots()
+
+    if not lock_storage(blocking=False):
+        logger.warning('Хранилище занято административной командой, ожидание её завершения.')
+        await asyncio.to_thread(lock_storage)
+
+    recovered = await asyncio.to_thread(recover_storage)
+    if recovered:
+        logger.info(f'Восстановлено записей из журнала: {recovered}')
+
+    if hasattr(signal, 'SIGUSR1'):
+        asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, profile_on_signal)
+
+    if primary_bot_id not in bots_by_id:
+        logger.warning(
+            'Основной бот не задан (PRIMARY_BOT_ID или TELEGRAM_TOKEN): '
+            'профили всех ботов хранятся в users/tenants/, профили из users/ не используются.'
+        )
+
     logger.info('Telegram-бот запущен.')
-    await dp.start_polling(bot)
+    background_tasks.add(asyncio.create_task(migrate_storage()))
+    background_tasks.add(asyncio.create_task(report_metrics()))
+    background_tasks.add(asyncio.create_task(evict_fsm_sessions()))
+    background_tasks.add(asyncio.create_task(refresh_weather_cache(api_key=OPENWEATHERMAP_TOKEN)))
+    background_tasks.add(asyncio.create_task(resolve_deferred(notify=notify_user)))
+    await dp.start_polling(*bots)
 
 if __name__ == '__main__':
     asyncio.run(main())
@@ -0,0 +1,347 @@
+import io
+import time
+import asyncio
+import datetime
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.conifg import CHART_WORKERS, CHART_CACHE_SIZE
+from src.storage import (
+    current_tenant,
+    add_event_listener,
+    iter_events,
+    EVENT_WATER,
+    EVENT_FOOD,
+    EVENT_WORKOUT
+)
+
+
+PERIODS = ('day', 'week')
+
+# Пул процессов отрисовки создаётся при первом графике
+_pool = None
+
+
+def period_start(period: str, now: float | None = None) -> int:
+    """
+    Возвращает начало периода графика по локальному времени.
+
+    Parameters
+    ----------
+    period : str
+        Период ('day' — сегодня, 'week' — последние 7 дней).
+    now : float | None
+        Текущее время (unix time); None — текущее.
+
+    Returns
+    -------
+    int
+        Начало периода (unix time).
+    """
+    today = time.localtime(now)
+    days_back = 6 if period == 'week' else 0
+
+    return int(time.mktime((today.tm_year, today.tm_mon, today.tm_mday - days_back, 0, 0, 0, 0, 0, -1)))
+
+
+def aggregate_events(user_id: int, period: str, start: int) -> tuple:
+    """
+    Собирает накопленные за период воду и калории из журнала событий пользователя.
+
+    Для дня значения считаются нарастающим итогом по часам, для недели — суммой по дням.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+    period : str
+        Период ('day' или 'week').
+    start : int
+        Начало периода (unix time).
+
+    Returns
+    -------
+    tuple
+        Подписи оси X, вода (мл), потреблённые и сожжённые калории (ккал) по интервалам.
+    """
+    if period == 'day':
+        labels = [f'{hour:02d}' for hour in range(24)]
+    else:
+        labels = [time.strftime('%d.%m', time.localtime(start + day * 86400 + 43200)) for day in range(7)]
+
+    water = [0] * len(labels)
+    consumed = [0] * len(labels)
+    burned = [0] * len(labels)
+
+    first_day = datetime.date.fromtimestamp(start)
+    for timestamp, kind, amount, *_ in iter_events(user_id, since=start):
+        if period == 'day':
+            slot = time.localtime(timestamp).tm_hour
+        else:
+            slot = (datetime.date.fromtimestamp(timestamp) - first_day).days
+        if slot >= len(labels):
+            continue
+
+        if kind == EVENT_WATER:
+            water[slot] += amount
+        elif kind == EVENT_FOOD:
+            consumed[slot] += amount
+        elif kind == EVENT_WORKOUT:
+            burned[slot] += amount
+
+    if period == 'day':
+        for series in (water, consumed, burned):
+            for i in range(1, len(series)):
+                series[i] += series[i - 1]
+
+    return labels, water, consumed, burned
+
+
+def render_chart(
+        period: str,
+        labels: list,
+        water: list,
+        consumed: list,
+        burned: list,
+        water_goal: int,
+        calorie_goal: int
+) -> bytes:
+    """
+    Рисует график воды и калорий в PNG. Выполняется в процессе пула.
+
+    Parameters
+    ----------
+    period : str
+        Период ('day' или 'week').
+    labels : list
+        Подписи оси X.
+    water : list
+        Вода (мл) по интервалам.
+    consumed : list
+        Потреблённые калории по интервалам.
+    burned : list
+        Сожжённые калории по интервалам.
+    water_goal : int
+        Дневная цель по воде.
+    calorie_goal : int
+        Дневная цель по калориям.
+
+    Returns
+    -------
+    bytes
+        Изображение в формате PNG.
+    """
+    # matplotlib тяжёлый, поэтому импортируется только в процессах отрисовки
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot
+
+    figure, (water_axis, calorie_axis) = pyplot.subplots(2, 1, figsize=(8, 6), sharex=True)
+    title = 'Сегодня' if period == 'day' else 'Последние 7 дней'
+    figure.suptitle(title)
+
+    if period == 'day':
+        water_axis.step(labels, water, where='post', color='tab:blue')
+        calorie_axis.step(labels, consumed, where='post', color='tab:orange', label='Потреблено')
+        calorie_axis.step(labels, burned, where='post', color='tab:green', label='Сожжено')
+    else:
+        positions = range(len(labels))
+        water_axis.bar(positions, water, color='tab:blue')
+        calorie_axis.bar([x - 0.2 for x in positions], consumed, width=0.4, color='tab:orange', label='Потреблено')
+        calorie_axis.bar([x + 0.2 for x in positions], burned, width=0.4, color='tab:green', label='Сожжено')
+        calorie_axis.set_xticks(list(positions), labels)
+
+    water_axis.axhline(water_goal, color='tab:blue', linestyle='--', linewidth=1)
+    water_axis.set_ylabel('Вода, мл')
+    calorie_axis.axhline(calorie_goal, color='tab:orange', linestyle='--', linewidth=1)
+    calorie_axis.set_ylabel('Калории, ккал')
+    calorie_axis.legend(loc='upper left')
+
+    buffer = io.BytesIO()
+    figure.savefig(buffer, format='png', dpi=100, bbox_inches='tight')
+    pyplot.close(figure)
+
+    return buffer.getvalue()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """
+    Возвращает пул процессов отрисовки, создавая его при первом обращении.
+
+    Процессы запускаются через spawn: бот многопоточный, и fork копировал бы
+    состояние чужих потоков.
+
+    Returns
+    -------
+    ProcessPoolExecutor
+        Пул процессов.
+    """
+    global _pool
+
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+
+    return _pool
+
+
+def _drop_pool() -> None:
+    """
+    Останавливает пул процессов отрисовки; следующий график создаст новый.
+
+    Вызывается и для пула, сломанного аварийным завершением его процесса.
+
+    Returns
+    -------
+    None
+    """
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+class ChartCache:
+    """
+    LRU-кэш отрисованных графиков прогресса по пользователю и периоду.
+
+    Запись сбрасывается только тогда, когда новое событие журнала попадает в её
+    период (см. invalidate), а также при смене начала периода или целей
+    пользователя. Событие, пришедшее во время отрисовки, увеличивает версию
+    ключа, и такой (уже устаревший) график отдаётся запросу, но не кэшируется.
+    После первой отправки вместо PNG хранится file_id Telegram,
+    и повторный запрос не требует ни отрисовки, ни загрузки файла.
+
+    Parameters
+    ----------
+    size : int
+        Максимальное количество графиков в кэше.
+    """
+    def __init__(self, size: int) -> None:
+        self.size = size
+        # (tenant, user_id, period) -> {'start', 'goals', 'png', 'file_id'}
+        self._entries = OrderedDict()
+        # Отрисовки в процессе, чтобы одинаковые запросы не рисовались дважды
+        self._rendering = {}
+        # Версии ключей, отрисовка которых идёт сейчас: их увеличивает invalidate
+        self._versions = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def invalidate(self, tenant: str, user_id: int, at: int) -> None:
+        """
+        Удаляет графики пользователя за периоды, которые затронуло новое событие.
+
+        Parameters
+        ----------
+        tenant : str
+            Пространство имён бота.
+        user_id : int
+            Уникальный идентификатор пользователя.
+        at : int
+            Время события (unix time).
+
+        Returns
+        -------
+        None
+        """
+        for period in PERIODS:
+            key = (tenant, user_id, period)
+            if key in self._versions:
+                self._versions[key] += 1
+
+            entry = self._entries.get(key)
+            if entry is not None and at >= entry['start']:
+                del self._entries[key]
+
+    async def get(self, user_data, period: str) -> dict:
+        """
+        Возвращает график из кэша либо рисует его в пуле процессов.
+
+        Parameters
+        ----------
+        user_data : UserRecord
+            Запись о пользователе (нужны цели по воде и калориям).
+        period : str
+            Период ('day' или 'week').
+
+        Returns
+        -------
+        dict
+            Запись кэша: 'file_id' (если график уже отправлялся в Telegram) либо 'png'.
+        """
+        key = (current_tenant.get(), user_data.user_id, period)
+        start = period_start(period)
+        goals = (user_data.water_goal, user_data.calorie_goal)
+
+        entry = self._entries.get(key)
+        if entry is not None and entry['start'] == start and entry['goals'] == goals:
+            self._entries.move_to_end(key)
+            return entry
+
+        rendering = self._rendering.get(key)
+        if rendering is not None:
+            return await asyncio.shield(rendering)
+
+        loop = asyncio.get_running_loop()
+        rendering = self._rendering[key] = loop.create_future()
+        self._versions[key] = 0
+        try:
+            series = await asyncio.to_thread(aggregate_events, user_data.user_id, period, start)
+            png = await loop.run_in_executor(_get_pool(), render_chart, period, *series, *goals)
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                _drop_pool()
+            rendering.set_exception(e)
+            # Исключение получат ожидающие запросы; если их нет, оно не должно попасть в лог цикла
+            rendering.exception()
+            raise
+        finally:
+            del self._rendering[key]
+            stale = self._versions.pop(key) != 0
+
+        entry = {'start': start, 'goals': goals, 'png': png, 'file_id': None}
+        if not stale:
+            self._entries[key] = entry
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+        rendering.set_result(entry)
+
+        return entry
+
+    @staticmethod
+    def remember_file_id(entry: dict, file_id: str) -> None:
+        """
+        Запоминает file_id отправленного графика, чтобы не загружать его повторно.
+
+        Parameters
+        ----------
+        entry : dict
+            Запись кэша, возвращённая get.
+        file_id : str
+            file_id фотографии в Telegram.
+
+        Returns
+        -------
+        None
+        """
+        entry['file_id'] = file_id
+        entry['png'] = None
+
+
+chart_cache = ChartCache(size=CHART_CACHE_SIZE)
+add_event_listener(chart_cache.invalidate)
+
+
+def close_charts() -> None:
+    """
+    Останавливает пул процессов отрисовки.
+
+    Returns
+    -------
+    None
+    """
+    _drop_pool()
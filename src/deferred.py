@@ -0,0 +1,407 @@
+import os
+import json
+import time
+import uuid
+import random
+import asyncio
+from config.conifg import (
+    DEFERRED_QUEUE_PATH,
+    DEFERRED_RETRY_INTERVAL,
+    DEFERRED_MAX_BACKOFF,
+    DEFERRED_MAX_ATTEMPTS,
+    DEFERRED_BATCH_SIZE,
+    LOOKUP_TIMEOUT,
+    NUTRITIONIX_ID,
+    NUTRITIONIX_TOKEN,
+    APININJAS_TOKEN
+)
+from src.middlewares import logger
+from src.phrasebook import phrasebook
+from src.states import Nutrients
+from src.storage import (
+    current_tenant,
+    use_tenant,
+    load_user_data,
+    save_user_data,
+    EVENT_FOOD,
+    EVENT_WORKOUT
+)
+from src.utils import (
+    UPSTREAM_ERRORS,
+    get_nutritionix,
+    get_workout,
+    translate_query
+)
+
+
+class DeferredQueue:
+    """
+    Очередь записей еды и тренировок, не обработанных из-за сбоя внешних API.
+
+    Хранится в JSONL-файле: каждая новая запись сбрасывается на диск до ответа
+    пользователю, изменения дописываются в конец, а завершённые записи
+    отмечаются строкой {'id': ..., 'done': true}. При загрузке более поздние
+    строки перекрывают ранние, файл периодически уплотняется.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу очереди.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries = None
+        self._done = 0
+
+    @property
+    def entries(self) -> dict:
+        """
+        Ожидающие записи id -> запись; загружаются с диска при первом обращении.
+        """
+        if self._entries is None:
+            self._entries = {}
+            try:
+                with open(self.path, 'r', encoding='UTF-8') as file:
+                    for line in file:
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError:
+                            # Строка, дописанная не полностью до сбоя
+                            continue
+                        if record.get('done'):
+                            self._entries.pop(record['id'], None)
+                        else:
+                            self._entries[record['id']] = record
+            except FileNotFoundError:
+                pass
+
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _append(self, record: dict, sync: bool = False) -> None:
+        """
+        Дописывает строку в файл очереди.
+
+        Parameters
+        ----------
+        record : dict
+            Запись либо отметка о завершении.
+        sync : bool
+            Выполнить fsync после записи.
+
+        Returns
+        -------
+        None
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='UTF-8') as file:
+            file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+
+    def put(self, kind: str, text: str, user_id: int, chat_id: int, bot_id: int, **details) -> dict:
+        """
+        Сохраняет запись для повторной обработки.
+
+        Parameters
+        ----------
+        kind : str
+            Тип записи ('food' или 'workout').
+        text : str
+            Исходный запрос пользователя.
+        user_id : int
+            Уникальный идентификатор пользователя.
+        chat_id : int
+            Чат для уведомления о результате.
+        bot_id : int
+            Бот, получивший запрос.
+        **details
+            Дополнительные поля (english, duration, weight).
+
+        Returns
+        -------
+        dict
+            Сохранённая запись.
+        """
+        now = int(time.time())
+        entry = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'text': text,
+            'user_id': user_id,
+            'chat_id': chat_id,
+            'bot_id': bot_id,
+            'tenant': current_tenant.get(),
+            'created': now,
+            'attempts': 0,
+            'next_attempt': now + DEFERRED_RETRY_INTERVAL,
+            **details
+        }
+
+        self.entries[entry['id']] = entry
+        self._append(entry, sync=True)
+
+        return entry
+
+    def due(self, limit: int) -> list:
+        """
+        Возвращает записи, время повторной попытки которых наступило.
+
+        Parameters
+        ----------
+        limit : int
+            Максимальное количество записей.
+
+        Returns
+        -------
+        list
+            Записи в порядке времени повторной попытки.
+        """
+        now = time.time()
+        due = [entry for entry in self.entries.values() if entry['next_attempt'] <= now]
+        due.sort(key=lambda entry: entry['next_attempt'])
+
+        return due[:limit]
+
+    def retry(self, entry: dict) -> None:
+        """
+        Откладывает запись с экспоненциальной задержкой.
+
+        Parameters
+        ----------
+        entry : dict
+            Запись очереди.
+
+        Returns
+        -------
+        None
+        """
+        entry['attempts'] += 1
+        delay = min(DEFERRED_RETRY_INTERVAL * 2 ** entry['attempts'], DEFERRED_MAX_BACKOFF)
+        entry['next_attempt'] = int(time.time() + delay * random.uniform(0.8, 1.2))
+        self._append(entry)
+
+    def done(self, entry: dict) -> None:
+        """
+        Удаляет обработанную запись из очереди.
+
+        Parameters
+        ----------
+        entry : dict
+            Запись очереди.
+
+        Returns
+        -------
+        None
+        """
+        if self.entries.pop(entry['id'], None) is None:
+            return
+
+        self._append({'id': entry['id'], 'done': True}, sync=True)
+        self._done += 1
+
+        if self._done >= 100:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Перезаписывает файл очереди, оставляя только ожидающие записи.
+
+        Returns
+        -------
+        None
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as file:
+            for entry in self.entries.values():
+                file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+
+        self._done = 0
+
+
+deferred_queue = DeferredQueue(path=DEFERRED_QUEUE_PATH)
+
+
+async def _resolve_values(kind: str, entry: dict) -> list:
+    """
+    Получает результат запроса: из словаря фраз либо от внешних API.
+
+    Parameters
+    ----------
+    kind : str
+        Тип записи ('food' или 'workout').
+    entry : dict
+        Запись очереди (для тренировки используются вес и длительность).
+
+    Returns
+    -------
+    list
+        Пищевая ценность либо [ккал на кг в минуту] для тренировки.
+    """
+    english, known = phrasebook.lookup(kind=kind, text=entry['text'])
+    values = phrasebook.estimate(known, text=entry['text'])
+    if values is not None:
+        return values
+
+    async with asyncio.timeout(LOOKUP_TIMEOUT):
+        if english is None:
+            english = entry.get('english') or await translate_query(query=entry['text'])
+
+        if kind == 'food':
+            values = list(await get_nutritionix(
+                query=english,
+                application_id=NUTRITIONIX_ID,
+                api_key=NUTRITIONIX_TOKEN
+            ))
+        else:
+            burned_calories = await get_workout(
+                activity=english,
+                weight=entry['weight'],
+                duration=entry['duration'],
+                api_key=APININJAS_TOKEN
+            )
+            values = [burned_calories / (entry['weight'] * entry['duration'])]
+
+    phrasebook.learn(kind=kind, text=entry['text'], english=english, values=values)
+
+    return values
+
+
+async def _apply(entry: dict, values: list) -> str:
+    """
+    Учитывает результат в прогрессе пользователя.
+
+    Parameters
+    ----------
+    entry : dict
+        Запись очереди.
+    values : list
+        Результат _resolve_values.
+
+    Returns
+    -------
+    str
+        Текст уведомления пользователю.
+    """
+    with use_tenant(entry['tenant']):
+        user_data = load_user_data(user_id=entry['user_id'])
+
+        if entry['kind'] == 'food':
+            nutrients = Nutrients(round(values[0]), *(round(value, 1) for value in values[1:]))
+            user_data.add_nutrients(nutrients)
+            await save_user_data(
+                user_data=user_data,
+                event=(EVENT_FOOD, nutrients.calories, nutrients, entry['created'])
+            )
+            added = f'учтено {nutrients.calories} ккал'
+        else:
+            burned_calories = round(values[0] * user_data.weight * entry['duration'])
+            user_data.burned_calories += burned_calories
+            user_data.logged_calories -= burned_calories
+            await save_user_data(
+                user_data=user_data,
+                event=(EVENT_WORKOUT, burned_calories, None, entry['created'])
+            )
+            added = f'сожжено {burned_calories} ккал'
+
+    return (
+        f'Отложенная запись «{entry["text"]}»: {added}.\n'
+        f'До достижения цели осталось {user_data.calorie_goal - user_data.logged_calories} ккал.'
+    )
+
+
+async def _settle(entry: dict, result, notify) -> None:
+    """
+    Завершает обработку записи по результату запроса: учитывает её, откладывает
+    повторную попытку либо снимает с очереди, и уведомляет пользователя.
+
+    Parameters
+    ----------
+    entry : dict
+        Запись очереди.
+    result : list | Exception
+        Результат _resolve_values либо его исключение.
+    notify : Callable
+        Корутина notify(bot_id, chat_id, text) для уведомления пользователя.
+
+    Returns
+    -------
+    None
+    """
+    if isinstance(result, UPSTREAM_ERRORS):
+        if entry['attempts'] + 1 < DEFERRED_MAX_ATTEMPTS:
+            deferred_queue.retry(entry)
+            return
+        text = f'Не удалось учесть «{entry["text"]}»: сервис недоступен. Попробуйте добавить запись заново.'
+    elif isinstance(result, Exception):
+        logger.warning(f'Отложенная запись {entry["id"]} не распознана: {result!r}')
+        text = f'Не удалось распознать «{entry["text"]}», запись не учтена.'
+    else:
+        try:
+            text = await _apply(entry, result)
+        except FileNotFoundError:
+            deferred_queue.done(entry)
+            return
+        except Exception as e:
+            # Сбой записи прогресса (диск, кодирование) не должен терять запись сразу
+            logger.exception(f'Отложенная запись {entry["id"]} не учтена: {e!r}')
+            if entry['attempts'] + 1 < DEFERRED_MAX_ATTEMPTS:
+                deferred_queue.retry(entry)
+                return
+            text = f'Не удалось учесть «{entry["text"]}», запись не сохранена.'
+
+    deferred_queue.done(entry)
+    await notify(entry['bot_id'], entry['chat_id'], text)
+
+
+async def resolve_deferred(notify) -> None:
+    """
+    Фоново обрабатывает отложенные записи пачками с экспоненциальной задержкой повторов.
+
+    Одинаковые запросы в пачке разрешаются одним обращением к API. Если сервис
+    по-прежнему недоступен, откладываются все записи группы. Ошибка обработки
+    одной записи (очередь на диске, сохранение, уведомление) записывается в лог
+    и не останавливает ни остальные записи, ни сам цикл.
+
+    Parameters
+    ----------
+    notify : Callable
+        Корутина notify(bot_id, chat_id, text) для уведомления пользователя.
+
+    Returns
+    -------
+    None
+    """
+    while True:
+        await asyncio.sleep(DEFERRED_RETRY_INTERVAL)
+
+        try:
+            groups = {}
+            for entry in deferred_queue.due(limit=DEFERRED_BATCH_SIZE):
+                groups.setdefault((entry['kind'], entry['text'].lower()), []).append(entry)
+
+            if not groups:
+                continue
+
+            results = await asyncio.gather(
+                *(_resolve_values(kind, entries[0]) for (kind, _), entries in groups.items()),
+                return_exceptions=True
+            )
+
+            for entries, result in zip(groups.values(), results):
+                for entry in entries:
+                    try:
+                        await _settle(entry, result, notify)
+                    except Exception as e:
+                        logger.exception(f'Отложенная запись {entry["id"]} не обработана: {e!r}')
+
+            logger.info(f'Отложенные записи: обработано групп {len(groups)}, в очереди {len(deferred_queue)}')
+        except Exception as e:
+            logger.exception(f'Сбой обработки отложенных записей: {e!r}')
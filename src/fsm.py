@@ -0,0 +1,104 @@
+import sys
+import time
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import StorageKey, StateType
+from aiogram.fsm.storage.memory import MemoryStorage
+
+
+class TTLMemoryStorage(MemoryStorage):
+    """
+    FSM-хранилище в памяти с вытеснением неактивных сессий.
+
+    В отличие от MemoryStorage не создаёт пустые записи при чтении
+    и удаляет запись сразу после очистки состояния.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self._touched = {}
+
+    def _touch(self, key: StorageKey) -> None:
+        """
+        Обновляет время последней активности сессии либо удаляет пустую сессию.
+
+        Parameters
+        ----------
+        key : StorageKey
+            Ключ сессии.
+
+        Returns
+        -------
+        None
+        """
+        record = self.storage.get(key)
+        if record is None or (record.state is None and not record.data):
+            self.storage.pop(key, None)
+            self._touched.pop(key, None)
+        else:
+            self._touched[key] = time.monotonic()
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self.storage[key].state = state.state if isinstance(state, State) else state
+        self._touch(key)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        record = self.storage.get(key)
+        return record.state if record is not None else None
+
+    async def set_data(self, key: StorageKey, data: dict) -> None:
+        self.storage[key].data = data.copy()
+        self._touch(key)
+
+    async def get_data(self, key: StorageKey) -> dict:
+        record = self.storage.get(key)
+        return record.data.copy() if record is not None else {}
+
+    async def get_value(self, storage_key: StorageKey, dict_key: str, default=None):
+        record = self.storage.get(storage_key)
+        if record is None:
+            return default
+        return await super().get_value(storage_key, dict_key, default)
+
+    def evict_idle(self, ttl: float) -> list:
+        """
+        Удаляет сессии, неактивные дольше заданного времени.
+
+        Parameters
+        ----------
+        ttl : float
+            Допустимое время неактивности в секундах.
+
+        Returns
+        -------
+        list
+            Пары (ключ, состояние) удалённых сессий.
+        """
+        deadline = time.monotonic() - ttl
+        expired = [key for key, touched in self._touched.items() if touched < deadline]
+
+        evicted = []
+        for key in expired:
+            record = self.storage.pop(key, None)
+            del self._touched[key]
+            if record is not None:
+                evicted.append((key, record.state))
+
+        return evicted
+
+    def metrics(self) -> dict:
+        """
+        Возвращает число живых сессий и приблизительный объём занимаемой ими памяти.
+
+        Returns
+        -------
+        dict
+            Метрики хранилища.
+        """
+        memory = 0
+        for record in self.storage.values():
+            memory += sys.getsizeof(record) + sys.getsizeof(record.data)
+            memory += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in record.data.items())
+
+        return {
+            'sessions': len(self.storage),
+            'memory_bytes': memory
+        }
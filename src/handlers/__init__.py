@@ -1,5 +1,7 @@
+from .admin_handlers import admin_router
 from .general_handlers import general_router
+from .inline_handlers import inline_router
 from .logging_handlers import logging_router
 from .parameters_handlers import parameters_router
 
-__all__ = ['general_router', 'logging_router', 'parameters_router']
+__all__ = ['admin_router', 'general_router', 'inline_router', 'logging_router', 'parameters_router']
@@ -0,0 +1,78 @@
+import asyncio
+from aiogram import Router, F
+from aiogram.types import Message
+from aiogram.filters import Command, CommandObject
+from config.conifg import (
+    ADMIN_IDS,
+    PROFILE_DEFAULT_SECONDS,
+    PROFILE_MAX_SECONDS
+)
+from src.middlewares import logger
+from src.profiler import profiler, format_summary
+
+
+admin_router = Router()
+# Команды роутера доступны только администраторам, остальным бот не отвечает
+admin_router.message.filter(F.from_user.id.in_(set(ADMIN_IDS)))
+
+
+async def report_profile(message: Message, task: asyncio.Task) -> None:
+    """
+    Дожидается окончания профилирования и отправляет сводку администратору.
+
+    Parameters
+    ----------
+    message : Message
+        Сообщение с командой '/profile'.
+    task : asyncio.Task
+        Задача профилирования.
+
+    Returns
+    -------
+    None
+    """
+    try:
+        summary = await task
+    except Exception as e:
+        logger.warning(f'Профилирование завершилось ошибкой: {e!r}')
+        await message.answer(f'Профилирование завершилось ошибкой: {e!r}')
+        return
+
+    await message.answer(format_summary(summary))
+
+
+@admin_router.message(Command('profile'))
+async def cmd_profile(message: Message, command: CommandObject, background_tasks: set) -> None:
+    """
+    Обрабатывает команду '/profile [секунды]' и запускает семплирующий профилировщик.
+
+    Parameters
+    ----------
+    message : Message
+        Объект сообщения, содержащий команду '/profile'.
+    command : CommandObject
+        Объект команды, содержащий аргументы (длительность в секундах).
+    background_tasks : set
+        Фоновые задачи бота, останавливаемые при завершении работы.
+
+    Returns
+    -------
+    None
+    """
+    try:
+        seconds = int(command.args) if command.args else PROFILE_DEFAULT_SECONDS
+        assert 0 < seconds <= PROFILE_MAX_SECONDS, f'Длительность должна быть от 1 до {PROFILE_MAX_SECONDS} с'
+
+        task = profiler.start(seconds)
+    except ValueError:
+        await message.answer('Длительность должна быть числом секунд.')
+        return
+    except (AssertionError, RuntimeError) as e:
+        await message.answer(f'{e}.')
+        return
+
+    await message.reply(f'Профилирование запущено на {seconds} с.')
+
+    for background_task in (task, asyncio.create_task(report_profile(message, task))):
+        background_tasks.add(background_task)
+        background_task.add_done_callback(background_tasks.discard)
@@ -2,12 +2,12 @@ from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
 from config.conifg import OPENWEATHERMAP_TOKEN
+from src.replies import format_profile
+from src.storage import load_user_data, save_user_data
 from src.utils import (
-    load_user_data,
     get_temperature,
     mifflin_st_jeor,
-    calculate_water_intake,
-    save_user_data
+    calculate_water_intake
 )
 
 
@@ -58,8 +58,11 @@ async def cmd_help(message: Message) -> None:
         '/log_food <еда и кол-во еды в свободной форме> - Отслеживание еды\n'
         '/log_workout <тип тренировки> <продолжительность, мин.>- Отслеживание тренировок\n'
         '/check_progress - Прогресс\n'
+        '/chart <day|week> - График воды и калорий за день или неделю\n'
         '/clear_progress - Очистка прогресса\n'
-        '/temperature - Получение температуры в вашем городе'
+        '/temperature - Получение температуры в вашем городе\n'
+        '@<имя бота> <начало названия> - Подсказки уже учтённых ранее еды и тренировок '
+        '(запись учитывается, если подсказка отправлена в чат с ботом)'
     )
 
 
@@ -82,18 +85,7 @@ async def cmd_list_profile(message: Message) -> None:
     try:
         user_data = load_user_data(user_id=user_id)
 
-        summary = (
-            'Ваш профиль:\n\n'
-            f'Вес: {user_data.weight} кг\n'
-            f'Рост: {user_data.height} см\n'
-            f'Возраст: {user_data.age} лет\n'
-            f'Активность: {user_data.activity_level} минут\n'
-            f'Город: {user_data.city}\n'
-            f'Цель по калориям: {user_data.calorie_goal} ккал\n'
-            f'Цель по воде: {user_data.water_goal} мл\n'
-        )
-
-        await message.reply(summary)
+        await message.reply(format_profile(user_data))
 
     except FileNotFoundError:
         await message.reply(
@@ -206,11 +198,9 @@ async def cmd_clear_progress(message: Message) -> None:
 
     try:
         user_data = load_user_data(user_id=user_id)
-        user_data.logged_water = 0
-        user_data.logged_calories = 0
-        user_data.burned_calories = 0
+        user_data.clear_progress()
 
-        save_user_data(user_data=user_data)
+        await save_user_data(user_data=user_data)
 
         await message.answer('Прогресс очищен!')
 
@@ -0,0 +1,102 @@
+import hashlib
+from aiogram import Router
+from aiogram.types import (
+    InlineQuery,
+    InlineQueryResultArticle,
+    InputTextMessageContent
+)
+from src.phrasebook import (
+    phrasebook,
+    parse_phrase,
+    RU_UNITS,
+    RU_UNIT_NAMES,
+    DEFAULT_QUANTITIES
+)
+
+
+inline_router = Router()
+
+# Длительность тренировки в подсказке, если пользователь её не ввёл
+DEFAULT_DURATION = 30
+
+
+def food_command(phrase: str, entry: dict, quantity: float | None, unit: str) -> str:
+    """
+    Формирует команду '/log_food' для подсказки.
+
+    Если пользователь не ввёл количество, подставляется количество в единицах
+    выученной записи, чтобы команда считалась по словарю без обращения к API.
+
+    Parameters
+    ----------
+    phrase : str
+        Название продукта.
+    entry : dict
+        Запись словаря фраз.
+    quantity : float | None
+        Количество, введённое пользователем.
+    unit : str
+        Единица измерения, введённая пользователем.
+
+    Returns
+    -------
+    str
+        Текст команды.
+    """
+    if quantity is None and entry['unit']:
+        unit = entry['unit']
+        quantity = DEFAULT_QUANTITIES.get(unit, 1)
+
+    if quantity is None:
+        return f'/log_food {phrase}'
+
+    unit_name = RU_UNIT_NAMES.get(unit, '')
+    return f'/log_food {quantity:g} {unit_name} {phrase}' if unit_name else f'/log_food {quantity:g} {phrase}'
+
+
+@inline_router.inline_query()
+async def inline_suggest(inline_query: InlineQuery) -> None:
+    """
+    Подсказывает продукты и тренировки по мере ввода в inline-режиме.
+
+    Подсказки строятся из префиксного индекса выученных фраз без обращения к внешним API.
+    Предлагаются только фразы, результат которых пересчитывается по словарю, поэтому
+    выбранная подсказка учитывается без перевода и запросов к API. Подсказка отправляется
+    в чат как команда '/log_food' или '/log_workout' и учитывается, если отправлена в чат с ботом.
+
+    Parameters
+    ----------
+    inline_query : InlineQuery
+        Inline-запрос (например, '200 г твор' или 'бег 45').
+
+    Returns
+    -------
+    None
+    """
+    quantity, unit, phrase = parse_phrase(inline_query.query, RU_UNITS)
+    words = phrase.split()
+    duration = int(words.pop()) if words and words[-1].isdigit() else None
+
+    results = []
+    for kind, suggestion, entry in phrasebook.suggest(' '.join(words)):
+        if kind == 'food':
+            text = food_command(suggestion, entry, quantity, unit)
+            values = phrasebook.estimate(entry, text.split(maxsplit=1)[1])
+            if values is None:
+                continue
+            description = f'≈ {round(values[0])} ккал'
+        elif ' ' not in suggestion and phrasebook.estimate(entry, suggestion) is not None:
+            minutes = duration or DEFAULT_DURATION
+            text = f'/log_workout {suggestion} {minutes}'
+            description = f'Тренировка, {minutes} мин.'
+        else:
+            continue
+
+        results.append(InlineQueryResultArticle(
+            id=hashlib.md5(text.encode()).hexdigest(),
+            title=text.split(maxsplit=1)[1],
+            description=description,
+            input_message_content=InputTextMessageContent(message_text=text)
+        ))
+
+    await inline_query.answer(results, cache_time=60, is_personal=False)
@@ -1,14 +1,29 @@
+import asyncio
 from aiogram import Router
-from aiogram.types import Message
+from aiogram.types import Message, BufferedInputFile
+from aiogram.enums import ChatAction
 from aiogram.filters import Command, CommandObject
 from config.conifg import (
     NUTRITIONIX_ID,
     NUTRITIONIX_TOKEN,
-    APININJAS_TOKEN
+    APININJAS_TOKEN,
+    LOOKUP_TIMEOUT
 )
-from src.utils import (
+from src.charts import PERIODS, chart_cache
+from src.deferred import deferred_queue
+from src.middlewares import logger
+from src.phrasebook import phrasebook
+from src.replies import format_water, format_food, format_workout, format_progress
+from src.states import Nutrients, RecordEncodeError
+from src.storage import (
     load_user_data,
     save_user_data,
+    EVENT_WATER,
+    EVENT_FOOD,
+    EVENT_WORKOUT
+)
+from src.utils import (
+    UPSTREAM_ERRORS,
     get_nutritionix,
     get_workout,
     translate_query
@@ -17,6 +32,11 @@ from src.utils import (
 
 logging_router = Router()
 
+# Ответ, если значение не помещается в профиль
+ENCODE_ERROR_REPLY = 'Слишком большое значение, запись не сохранена. Попробуйте ещё раз.'
+# Ответ вместо сообщения-заглушки при непредвиденной ошибке
+UNEXPECTED_ERROR_REPLY = 'Не удалось учесть запись, попробуйте ещё раз позже.'
+
 
 @logging_router.message(Command('log_water'))
 async def cmd_log_water(message: Message, command: CommandObject) -> None:
@@ -40,18 +60,12 @@ async def cmd_log_water(message: Message, command: CommandObject) -> None:
 
         user_data = load_user_data(user_id=message.from_user.id)
         user_data.logged_water += water_amount
-        save_user_data(user_data=user_data)
+        await save_user_data(user_data=user_data, event=(EVENT_WATER, water_amount))
 
-        if user_data.water_goal > user_data.logged_water:
-            await message.reply(
-                f'Добавлено: {water_amount} мл воды.\n'
-                f'До достижения цели осталось {user_data.water_goal - user_data.logged_water} мл.'
-            )
-        else:
-            await message.reply(
-                f'Добавлено: {water_amount} мл воды. Вы достигли дневной цели!'
-            )
+        await message.reply(format_water(user_data, water_amount))
 
+    except RecordEncodeError:
+        await message.reply(ENCODE_ERROR_REPLY)
     except (ValueError, TypeError):
         await message.answer('Кол-во воды должно быть числовым значением! Попробуйте ещё раз.')
     except AssertionError as e:
@@ -63,11 +77,46 @@ async def cmd_log_water(message: Message, command: CommandObject) -> None:
         )
 
 
+# Ответ, если запись отложена из-за недоступности внешних сервисов
+DEFERRED_REPLY = (
+    'Сервис подсчёта сейчас недоступен. Запись сохранена и будет учтена автоматически, '
+    'я пришлю уведомление.'
+)
+
+
+async def reply_or_edit(message: Message, placeholder: Message | None, text: str) -> None:
+    """
+    Редактирует сообщение-заглушку либо отвечает на сообщение, если заглушки ещё нет.
+
+    Parameters
+    ----------
+    message : Message
+        Исходное сообщение пользователя.
+    placeholder : Message | None
+        Сообщение-заглушка, отправленное до обращения к внешним API.
+    text : str
+        Текст ответа.
+
+    Returns
+    -------
+    None
+    """
+    if placeholder is None:
+        await message.answer(text)
+    else:
+        await placeholder.edit_text(text)
+
+
 @logging_router.message(Command('log_food'))
 async def cmd_log_food(message: Message, command: CommandObject) -> None:
     """
     Обрабатывает команду '/log_food' для отслеживания потреблённой еды и калорий.
 
+    Если фраза уже выучена в той же единице измерения, калории считаются по словарю
+    без обращения к переводчику и Nutritionix. Иначе сразу отвечает сообщением-заглушкой
+    и редактирует его после получения ответа от переводчика и Nutritionix. При сбое
+    или долгом ответе внешних сервисов запись откладывается в очередь.
+
     Parameters
     ----------
     message : Message
@@ -79,41 +128,67 @@ async def cmd_log_food(message: Message, command: CommandObject) -> None:
     -------
     None
     """
+    placeholder = None
+
     try:
         query = command.args
         assert query is not None, 'Запрос не может быть пустым'
 
-        translated_query = await translate_query(query=query)
-
-        calories = await get_nutritionix(
-            query=translated_query,
-            application_id=NUTRITIONIX_ID,
-            api_key=NUTRITIONIX_TOKEN
-        )
-
         user_data = load_user_data(user_id=message.from_user.id)
-        user_data.logged_calories += calories
-        save_user_data(user_data=user_data)
 
-        if user_data.calorie_goal > user_data.logged_calories:
-            await message.reply(
-                f'Добавлено: {calories} ккал.\n'
-                f'До достижения цели осталось {user_data.calorie_goal - user_data.logged_calories} ккал.'
-            )
-        else:
-            await message.reply(
-                f'Добавлено: {calories} ккал. Вы достигли дневной цели!'
-            )
+        translated_query, entry = phrasebook.lookup(kind='food', text=query)
+        values = phrasebook.estimate(entry, text=query)
 
+        if values is not None:
+            nutrients = Nutrients(round(values[0]), *(round(value, 1) for value in values[1:]))
+        else:
+            placeholder = await message.reply('⏳ Считаю калории...')
+            await message.bot.send_chat_action(chat_id=message.chat.id, action=ChatAction.TYPING)
+
+            try:
+                async with asyncio.timeout(LOOKUP_TIMEOUT):
+                    if translated_query is None:
+                        translated_query = await translate_query(query=query)
+
+                    nutrients = await get_nutritionix(
+                        query=translated_query,
+                        application_id=NUTRITIONIX_ID,
+                        api_key=NUTRITIONIX_TOKEN
+                    )
+            except UPSTREAM_ERRORS:
+                deferred_queue.put(
+                    kind='food',
+                    text=query,
+                    user_id=message.from_user.id,
+                    chat_id=message.chat.id,
+                    bot_id=message.bot.id,
+                    english=translated_query
+                )
+                await reply_or_edit(message, placeholder, DEFERRED_REPLY)
+                return
+
+            phrasebook.learn(kind='food', text=query, english=translated_query, values=list(nutrients))
+
+        user_data.add_nutrients(nutrients)
+        await save_user_data(user_data=user_data, event=(EVENT_FOOD, nutrients.calories, nutrients))
+
+        await reply_or_edit(message, placeholder, format_food(user_data, nutrients))
+
+    except RecordEncodeError:
+        await reply_or_edit(message, placeholder, ENCODE_ERROR_REPLY)
     except AssertionError as e:
         await message.answer(f'{e}! Попробуйте ещё раз.')
-    except KeyError:
-        await message.answer('Ничего не нашёл, попробуйте переформулировать запрос.')
+    except (KeyError, IndexError, TypeError, ValueError):
+        # Nutritionix не нашёл продукт либо вернул ответ неожиданного вида
+        await reply_or_edit(message, placeholder, 'Ничего не нашёл, попробуйте переформулировать запрос.')
     except FileNotFoundError:
         await message.reply(
             'Вы ещё не заполнили свой профиль!\n'
             'Используйте команду /set_profile'
         )
+    except Exception as e:
+        logger.exception(f'Не удалось учесть еду для {message.from_user.id}: {e!r}')
+        await reply_or_edit(message, placeholder, UNEXPECTED_ERROR_REPLY)
 
 
 @logging_router.message(Command('log_workout'))
@@ -121,6 +196,11 @@ async def cmd_log_workout(message: Message, command: CommandObject) -> None:
     """
     Обрабатывает команду '/log_workout' для отслеживания тренировок и сжигания калорий.
 
+    Если тренировка уже выучена, сожжённые калории считаются по словарю без обращения
+    к переводчику и API Ninjas. Иначе сразу отвечает сообщением-заглушкой и редактирует
+    его после получения ответа от переводчика и API Ninjas. При сбое или долгом ответе
+    внешних сервисов запись откладывается в очередь.
+
     Parameters
     ----------
     message : Message
@@ -132,6 +212,8 @@ async def cmd_log_workout(message: Message, command: CommandObject) -> None:
     -------
     None
     """
+    placeholder = None
+
     try:
         activity, duration = command.args.split()
         duration = int(duration)
@@ -139,34 +221,62 @@ async def cmd_log_workout(message: Message, command: CommandObject) -> None:
         assert activity is not None, 'Запрос не должен быть пустым'
         assert duration > 0, 'Длительность должна быть положительным числом'
 
-        translate_activity = await translate_query(query=activity)
-
         user_data = load_user_data(user_id=message.from_user.id)
 
-        burned_calories = await get_workout(
-            activity=translate_activity,
-            weight=user_data.weight,
-            duration=duration,
-            api_key=APININJAS_TOKEN
-        )
+        translate_activity, entry = phrasebook.lookup(kind='workout', text=activity)
+        values = phrasebook.estimate(entry, text=activity)
+
+        if values is not None:
+            burned_calories = round(values[0] * user_data.weight * duration)
+        else:
+            placeholder = await message.reply('⏳ Считаю сожжённые калории...')
+            await message.bot.send_chat_action(chat_id=message.chat.id, action=ChatAction.TYPING)
+
+            try:
+                async with asyncio.timeout(LOOKUP_TIMEOUT):
+                    if translate_activity is None:
+                        translate_activity = await translate_query(query=activity)
+
+                    burned_calories = await get_workout(
+                        activity=translate_activity,
+                        weight=user_data.weight,
+                        duration=duration,
+                        api_key=APININJAS_TOKEN
+                    )
+            except UPSTREAM_ERRORS:
+                deferred_queue.put(
+                    kind='workout',
+                    text=activity,
+                    user_id=message.from_user.id,
+                    chat_id=message.chat.id,
+                    bot_id=message.bot.id,
+                    english=translate_activity,
+                    weight=user_data.weight,
+                    duration=duration
+                )
+                await reply_or_edit(message, placeholder, DEFERRED_REPLY)
+                return
+
+            phrasebook.learn(
+                kind='workout',
+                text=activity,
+                english=translate_activity,
+                values=[burned_calories / (user_data.weight * duration)]
+            )
 
         user_data.burned_calories += burned_calories
         user_data.logged_calories -= burned_calories
 
-        save_user_data(user_data=user_data)
+        await save_user_data(user_data=user_data, event=(EVENT_WORKOUT, burned_calories))
 
-        if user_data.calorie_goal > user_data.logged_calories:
-            await message.reply(
-                f'Сожжено: {burned_calories} ккал.\n'
-                f'До достижения цели осталось {user_data.calorie_goal - user_data.logged_calories} ккал.'
-            )
-        else:
-            await message.reply(
-                f'Сожжено: {burned_calories} ккал. Вы достигли дневной цели!'
-            )
+        await reply_or_edit(message, placeholder, format_workout(user_data, burned_calories))
 
-    except (ValueError, TypeError, AttributeError):
-        await message.answer(
+    except RecordEncodeError:
+        await reply_or_edit(message, placeholder, ENCODE_ERROR_REPLY)
+    except (ValueError, TypeError, AttributeError, KeyError, IndexError):
+        await reply_or_edit(
+            message,
+            placeholder,
             'Значения должны быть в виде <тренировка> <продолжительность, мин.>\n'
             'Либо такого вида тренировки не найдено!'
         )
@@ -177,6 +287,9 @@ async def cmd_log_workout(message: Message, command: CommandObject) -> None:
             'Вы ещё не заполнили свой профиль!\n'
             'Используйте команду /set_profile'
         )
+    except Exception as e:
+        logger.exception(f'Не удалось учесть тренировку для {message.from_user.id}: {e!r}')
+        await reply_or_edit(message, placeholder, UNEXPECTED_ERROR_REPLY)
 
 
 @logging_router.message(Command('check_progress'))
@@ -198,18 +311,55 @@ async def cmd_check_progress(message: Message) -> None:
     try:
         user_data = load_user_data(user_id=user_id)
 
+        await message.reply(format_progress(user_data))
+    except FileNotFoundError:
         await message.reply(
-            '📊 Прогресс:\n\n'
-            'Вода:\n'
-            f'- Выпито: {user_data.logged_water} мл. из {user_data.water_goal} мл.\n'
-            f'- Осталось: {user_data.water_goal - user_data.logged_water} мл.\n'
-            'Калории:\n'
-            f'- Потреблено: {user_data.logged_calories} ккал. из {user_data.calorie_goal} ккал.\n'
-            f'- Сожжено: {user_data.burned_calories} ккал.\n'
-            f'- Осталось: {user_data.calorie_goal - user_data.logged_calories} ккал.\n'
+            'Вы ещё не заполнили свой профиль!\n'
+            'Используйте команду /set_profile'
         )
+
+
+@logging_router.message(Command('chart'))
+async def cmd_chart(message: Message, command: CommandObject) -> None:
+    """
+    Обрабатывает команду '/chart' и отправляет график воды и калорий за день либо неделю.
+
+    Parameters
+    ----------
+    message : Message
+        Объект сообщения, содержащий команду '/chart'.
+    command : CommandObject
+        Объект команды, содержащий аргументы (период: day или week).
+
+    Returns
+    -------
+    None
+    """
+    period = (command.args or 'day').strip().lower()
+    if period not in PERIODS:
+        await message.reply('Используйте формат: /chart <day|week>')
+        return
+
+    try:
+        user_data = load_user_data(user_id=message.from_user.id)
     except FileNotFoundError:
         await message.reply(
             'Вы ещё не заполнили свой профиль!\n'
             'Используйте команду /set_profile'
         )
+        return
+
+    try:
+        entry = await chart_cache.get(user_data, period)
+    except Exception as e:
+        # В том числе BrokenProcessPool: пул будет пересоздан при следующем запросе
+        logger.warning(f'Не удалось построить график для {message.from_user.id}: {e!r}')
+        await message.reply('Не удалось построить график, попробуйте позже.')
+        return
+    if entry['file_id'] is not None:
+        await message.reply_photo(photo=entry['file_id'])
+        return
+
+    await message.bot.send_chat_action(chat_id=message.chat.id, action=ChatAction.UPLOAD_PHOTO)
+    sent = await message.reply_photo(photo=BufferedInputFile(entry['png'], filename=f'{period}.png'))
+    chart_cache.remember_file_id(entry, sent.photo[-1].file_id)
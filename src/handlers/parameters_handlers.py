@@ -4,8 +4,8 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from config.conifg import OPENWEATHERMAP_TOKEN
 from src.states import ParametersState, UserState
+from src.storage import save_user_data
 from src.utils import (
-    save_user_data,
     mifflin_st_jeor,
     calculate_water_intake,
     get_temperature
@@ -269,6 +269,7 @@ async def process_calorie_goal(message: Message, state: FSMContext) -> None:
     try:
         calorie_goal = int(message.text.strip())
         assert calorie_goal > 0, 'Цель по калориям не может быть отрицательной'
+        assert calorie_goal <= 20000, 'Слишком большая цель по калориям'
 
         await state.update_data(calorie_goal=calorie_goal)
 
@@ -321,6 +322,7 @@ async def process_calories_goal(message: Message, state: FSMContext) -> None:
     try:
         water_goal = int(message.text.strip())
         assert water_goal > 0, 'Цель по воде не может быть отрицательной'
+        assert water_goal <= 20000, 'Слишком большая цель по воде'
 
         await state.update_data(water_goal=water_goal)
 
@@ -341,7 +343,7 @@ async def process_calories_goal(message: Message, state: FSMContext) -> None:
             burned_calories=0
         )
 
-        save_user_data(user_data=user_data)
+        await save_user_data(user_data=user_data)
 
         summary = (
             'Ваш профиль:\n\n'
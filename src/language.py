@@ -0,0 +1,178 @@
+import re
+
+
+# Словарь частых продуктов и активностей (RU -> EN) с основными словоформами
+RU_EN_DICTIONARY = {
+    'яблоко': 'apple', 'яблока': 'apple', 'яблок': 'apples', 'яблоки': 'apples',
+    'банан': 'banana', 'банана': 'banana', 'бананов': 'bananas', 'бананы': 'bananas',
+    'апельсин': 'orange', 'апельсина': 'orange', 'апельсинов': 'oranges',
+    'груша': 'pear', 'груши': 'pears', 'груш': 'pears',
+    'яйцо': 'egg', 'яйца': 'eggs', 'яиц': 'eggs',
+    'хлеб': 'bread', 'хлеба': 'bread',
+    'рис': 'rice', 'риса': 'rice',
+    'гречка': 'buckwheat', 'гречки': 'buckwheat',
+    'овсянка': 'oatmeal', 'овсянки': 'oatmeal',
+    'макароны': 'pasta', 'макарон': 'pasta',
+    'картофель': 'potato', 'картошка': 'potato', 'картошки': 'potato',
+    'курица': 'chicken', 'курицы': 'chicken', 'куриная': 'chicken', 'куриной': 'chicken',
+    'грудка': 'breast', 'грудки': 'breast',
+    'говядина': 'beef', 'говядины': 'beef',
+    'свинина': 'pork', 'свинины': 'pork',
+    'рыба': 'fish', 'рыбы': 'fish',
+    'лосось': 'salmon', 'лосося': 'salmon',
+    'творог': 'cottage cheese', 'творога': 'cottage cheese',
+    'сыр': 'cheese', 'сыра': 'cheese',
+    'молоко': 'milk', 'молока': 'milk',
+    'кефир': 'kefir', 'кефира': 'kefir',
+    'йогурт': 'yogurt', 'йогурта': 'yogurt',
+    'масло': 'butter', 'масла': 'butter',
+    'сахар': 'sugar', 'сахара': 'sugar',
+    'кофе': 'coffee',
+    'чай': 'tea', 'чая': 'tea',
+    'сок': 'juice', 'сока': 'juice',
+    'салат': 'salad', 'салата': 'salad',
+    'суп': 'soup', 'супа': 'soup',
+    'пицца': 'pizza', 'пиццы': 'pizza',
+    'шоколад': 'chocolate', 'шоколада': 'chocolate',
+    'орехи': 'nuts', 'орехов': 'nuts',
+    'помидор': 'tomato', 'помидора': 'tomato', 'помидоров': 'tomatoes',
+    'огурец': 'cucumber', 'огурца': 'cucumber', 'огурцов': 'cucumbers',
+    'стакан': 'cup', 'стакана': 'cups', 'стаканов': 'cups',
+    'ложка': 'tablespoon', 'ложки': 'tablespoons', 'ложек': 'tablespoons',
+    'кусок': 'slice', 'куска': 'slices', 'кусков': 'slices',
+    'тарелка': 'plate', 'тарелки': 'plates',
+    'г': 'g', 'гр': 'g', 'грамм': 'g', 'граммов': 'g',
+    'кг': 'kg', 'мл': 'ml', 'л': 'l',
+    'бег': 'running', 'бегом': 'running',
+    'ходьба': 'walking', 'прогулка': 'walking',
+    'плавание': 'swimming',
+    'велосипед': 'cycling', 'велоспорт': 'cycling',
+    'йога': 'yoga',
+    'футбол': 'soccer',
+    'баскетбол': 'basketball',
+    'теннис': 'tennis',
+    'бокс': 'boxing',
+    'танцы': 'dancing',
+    'лыжи': 'skiing',
+    'гребля': 'rowing',
+    'аэробика': 'aerobics',
+    'и': 'and', 'с': 'with',
+}
+
+_TOKEN_PATTERN = re.compile(r'\d+(?:[.,]\d+)?|[^\W\d_]+|[^\w\s]')
+_CYRILLIC_PATTERN = re.compile(r'[а-яё]', re.IGNORECASE)
+_LATIN_PATTERN = re.compile(r'[a-z]', re.IGNORECASE)
+_WORD_PATTERN = re.compile(r'\w')
+
+
+def cyrillic_ratio(text: str) -> float:
+    """
+    Вычисляет долю кириллических символов среди всех букв текста.
+
+    Parameters
+    ----------
+    text : str
+        Исходный текст.
+
+    Returns
+    -------
+    float
+        Доля кириллических букв (0.0, если букв в тексте нет).
+    """
+    cyrillic = len(_CYRILLIC_PATTERN.findall(text))
+    latin = len(_LATIN_PATTERN.findall(text))
+
+    if cyrillic + latin == 0:
+        return 0.0
+
+    return cyrillic / (cyrillic + latin)
+
+
+def needs_translation(text: str) -> bool:
+    """
+    Определяет, нужен ли перевод текста на английский язык.
+
+    Parameters
+    ----------
+    text : str
+        Исходный текст.
+
+    Returns
+    -------
+    bool
+        False для английского или числового текста, иначе True.
+    """
+    return cyrillic_ratio(text) > 0
+
+
+def split_tokens(text: str) -> list:
+    """
+    Разбивает текст на токены (слова, числа и знаки препинания).
+
+    Parameters
+    ----------
+    text : str
+        Исходный текст.
+
+    Returns
+    -------
+    list
+        Список токенов.
+    """
+    return _TOKEN_PATTERN.findall(text)
+
+
+def translate_tokens(text: str) -> tuple:
+    """
+    Переводит известные токены по локальному словарю.
+
+    Английские, числовые токены и знаки препинания сохраняются как есть,
+    неизвестные русские токены возвращаются в списке непереведённых.
+
+    Parameters
+    ----------
+    text : str
+        Исходный текст.
+
+    Returns
+    -------
+    tuple
+        Список токенов (str) и список индексов непереведённых токенов.
+    """
+    tokens = split_tokens(text)
+    unknown = []
+
+    for i, token in enumerate(tokens):
+        if not _CYRILLIC_PATTERN.search(token):
+            continue
+
+        translated = RU_EN_DICTIONARY.get(token.lower())
+        if translated is None:
+            unknown.append(i)
+        else:
+            tokens[i] = translated
+
+    return tokens, unknown
+
+
+def join_tokens(tokens: list) -> str:
+    """
+    Собирает строку из токенов без пробелов перед знаками препинания.
+
+    Parameters
+    ----------
+    tokens : list
+        Список токенов.
+
+    Returns
+    -------
+    str
+        Собранная строка.
+    """
+    text = ''
+    for token in tokens:
+        if text and _WORD_PATTERN.match(token):
+            text += ' '
+        text += token
+
+    return text
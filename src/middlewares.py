@@ -1,7 +1,14 @@
 import sys
+import time
+import asyncio
+import contextlib
 from loguru import logger
 from aiogram import BaseMiddleware
-from aiogram.types import Message
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.types import Message, Update
+from config.conifg import TRACE_SLOW_THRESHOLD_MS
+from src.storage import use_tenant
+from src.tracing import trace, span
 
 
 logger.remove()
@@ -11,4 +18,295 @@ logger.add(sys.stdout, level='INFO', format='{time} {level} {message}')
 class LoggingMiddleware(BaseMiddleware):
     async def __call__(self, handler, event: Message, data: dict):
         logger.info(f'Получено сообщение: {event.text}')
-        return await handler(event, data)
+
+        command = event.text.split(maxsplit=1)[0] if event.text else 'message'
+        with trace(command, user_id=event.from_user.id if event.from_user else None) as root:
+            result = await handler(event, data)
+
+        if root.duration_ms >= TRACE_SLOW_THRESHOLD_MS:
+            breakdown = ', '.join(f'{child.name}={child.duration_ms:.0f} мс' for child in root.children)
+            logger.warning(f'Медленная обработка {command}: {root.duration_ms:.0f} мс ({breakdown})')
+
+        return result
+
+
+class TracingRequestMiddleware(BaseRequestMiddleware):
+    """
+    Оборачивает запросы к Telegram Bot API (ответы, редактирования) в участки трассировки.
+    """
+    async def __call__(self, make_request, bot, method):
+        with span(f'telegram.{method.__api_method__}'):
+            return await make_request(bot, method)
+
+
+class TenantMiddleware(BaseMiddleware):
+    """
+    Выбирает пространство имён хранилища по боту, получившему обновление,
+    и собирает метрики обработки по каждому боту.
+
+    Время ожидания в очереди SchedulerMiddleware (data['scheduler_wait'])
+    из времени обработки вычитается: доля бота отражает только его работу,
+    а не ожидание за обновлениями других ботов.
+
+    Parameters
+    ----------
+    tenants : dict
+        Соответствие id бота -> пространство имён ('' — основной бот).
+    """
+    def __init__(self, tenants: dict) -> None:
+        self.tenants = tenants
+        self._updates = {}
+        self._seconds = {}
+
+    async def __call__(self, handler, event: Update, data: dict):
+        bot_id = data['bot'].id
+        started = time.monotonic()
+
+        try:
+            with use_tenant(self.tenants.get(bot_id, str(bot_id))):
+                return await handler(event, data)
+        finally:
+            self._updates[bot_id] = self._updates.get(bot_id, 0) + 1
+            elapsed = time.monotonic() - started - data.get('scheduler_wait', 0.0)
+            self._seconds[bot_id] = self._seconds.get(bot_id, 0.0) + elapsed
+
+    def metrics(self) -> dict:
+        """
+        Возвращает число обновлений и суммарное время обработки по ботам и сбрасывает их.
+
+        Returns
+        -------
+        dict
+            Метрики вида id бота -> {'updates', 'seconds', 'share'}.
+        """
+        total = sum(self._seconds.values())
+        metrics = {
+            bot_id: {
+                'updates': updates,
+                'seconds': round(self._seconds[bot_id], 3),
+                'share': round(self._seconds[bot_id] / total, 3) if total else 0.0
+            }
+            for bot_id, updates in self._updates.items()
+        }
+
+        self._updates.clear()
+        self._seconds.clear()
+
+        return metrics
+
+
+class DuplicateCommandMiddleware(BaseMiddleware):
+    """
+    Схлопывает повторные команды, пришедшие до завершения обработки первой.
+
+    Parameters
+    ----------
+    commands : tuple
+        Команды, для которых отслеживаются дубликаты (например, '/log_food').
+    """
+    def __init__(self, commands: tuple) -> None:
+        self.commands = commands
+        self._pending = set()
+        self.collapsed = 0
+
+    async def __call__(self, handler, event: Update, data: dict):
+        message = event.message
+        if message is None or not message.text or not message.text.startswith(self.commands):
+            return await handler(event, data)
+
+        key = (data['bot'].id, message.chat.id, ' '.join(message.text.lower().split()))
+        if key in self._pending:
+            self.collapsed += 1
+            logger.info(f'Повторная команда схлопнута: {message.text}')
+            await message.reply('Этот запрос уже обрабатывается, пожалуйста, подождите.')
+            return None
+
+        self._pending.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._pending.discard(key)
+
+
+class SchedulerMiddleware(BaseMiddleware):
+    """
+    Планировщик обработки обновлений.
+
+    Ограничивает общее число одновременно обрабатываемых обновлений,
+    сохраняет порядок сообщений внутри одного чата и отбрасывает
+    обновления при переполнении очередей.
+
+    Parameters
+    ----------
+    max_concurrency : int
+        Максимальное число одновременно обрабатываемых обновлений.
+    max_chat_queue : int
+        Максимальное число обновлений одного чата в очереди (включая обрабатываемое).
+    max_pending : int
+        Максимальное общее число обновлений, ожидающих обработки.
+    """
+    def __init__(self, max_concurrency: int, max_chat_queue: int, max_pending: int) -> None:
+        self.max_chat_queue = max_chat_queue
+        self.max_pending = max_pending
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._chat_locks = {}
+        self._chat_depth = {}
+        # Задачи обновлений, ожидающих обработки либо обрабатываемых
+        self._tasks = set()
+
+        self.pending = 0
+        self.in_flight = 0
+        self.processed = 0
+        self.shed = 0
+        self.max_wait = 0.0
+        self.total_wait = 0.0
+
+    async def __call__(self, handler, event: Update, data: dict):
+        chat = data.get('event_chat')
+
+        # Inline-запросам не нужен порядок: они проходят только через общий семафор и не ждут
+        # команд из личного чата пользователя (id личного чата совпадает с id пользователя)
+        if chat is None and event.inline_query is not None:
+            if self.pending >= self.max_pending:
+                self.shed += 1
+                return None
+            return await self._run(handler, event, data, lock=None)
+
+        user = data.get('event_from_user')
+        chat_id = chat.id if chat else user.id if user else 0
+        # Один и тот же пользователь может писать нескольким ботам процесса
+        key = (data['bot'].id, chat_id)
+        chat_depth = self._chat_depth.get(key, 0)
+
+        if chat_depth >= self.max_chat_queue or self.pending >= self.max_pending:
+            self.shed += 1
+            logger.warning(f'Обновление {event.update_id} отброшено: очередь чата {chat_id} переполнена')
+            if event.message and chat_depth >= self.max_chat_queue:
+                await event.message.answer('Слишком много запросов, дождитесь ответа на предыдущие.')
+            return None
+
+        self._chat_depth[key] = chat_depth + 1
+        lock = self._chat_locks.setdefault(key, asyncio.Lock())
+
+        try:
+            return await self._run(handler, event, data, lock=lock)
+        finally:
+            self._chat_depth[key] -= 1
+            if not self._chat_depth[key]:
+                del self._chat_depth[key]
+                del self._chat_locks[key]
+
+    async def _run(self, handler, event: Update, data: dict, lock: asyncio.Lock | None):
+        """
+        Обрабатывает обновление под общим семафором и, если задана, блокировкой чата.
+
+        Parameters
+        ----------
+        handler : Callable
+            Следующий обработчик цепочки.
+        event : Update
+            Обновление.
+        data : dict
+            Данные обработчика.
+        lock : asyncio.Lock | None
+            Блокировка чата, сохраняющая порядок сообщений; None — без неё.
+
+        Returns
+        -------
+        Any
+            Результат обработчика.
+        """
+        self.pending += 1
+        queued_at = time.monotonic()
+        started = False
+        task = asyncio.current_task()
+        self._tasks.add(task)
+
+        try:
+            async with lock if lock is not None else contextlib.nullcontext():
+                async with self._semaphore:
+                    started = True
+                    wait = time.monotonic() - queued_at
+                    self.pending -= 1
+                    self.in_flight += 1
+                    self.total_wait += wait
+                    self.max_wait = max(self.max_wait, wait)
+                    # Внешние middleware (TenantMiddleware) не учитывают ожидание как работу бота
+                    data['scheduler_wait'] = wait
+
+                    try:
+                        return await handler(event, data)
+                    finally:
+                        self.in_flight -= 1
+                        self.processed += 1
+        finally:
+            self._tasks.discard(task)
+            if not started:
+                self.pending -= 1
+
+    async def drain(self, timeout: float) -> int:
+        """
+        Дожидается завершения обработки всех принятых обновлений.
+
+        Parameters
+        ----------
+        timeout : float
+            Максимальное время ожидания в секундах.
+
+        Returns
+        -------
+        int
+            Количество обновлений, не обработанных до истечения времени.
+        """
+        deadline = time.monotonic() + timeout
+
+        # Даём только что созданным задачам дойти до планировщика
+        await asyncio.sleep(0)
+        while (self.pending or self.in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        return self.pending + self.in_flight
+
+    async def cancel(self) -> None:
+        """
+        Отменяет обработку оставшихся обновлений и дожидается её завершения.
+
+        Вызывается после drain, если время ожидания истекло: обработчики
+        не должны обращаться к хранилищу после его закрытия.
+
+        Returns
+        -------
+        None
+        """
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def metrics(self) -> dict:
+        """
+        Возвращает текущие метрики очередей и сбрасывает накопленные за период.
+
+        Returns
+        -------
+        dict
+            Метрики планировщика.
+        """
+        metrics = {
+            'pending': self.pending,
+            'in_flight': self.in_flight,
+            'chats': len(self._chat_depth),
+            'processed': self.processed,
+            'shed': self.shed,
+            'avg_wait': self.total_wait / self.processed if self.processed else 0.0,
+            'max_wait': self.max_wait
+        }
+
+        self.processed = 0
+        self.shed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        return metrics
@@ -0,0 +1,426 @@
+import os
+import json
+import time
+from config.conifg import PHRASEBOOK_PATH
+from src.language import RU_EN_DICTIONARY, split_tokens, join_tokens
+from src.suggestions import PrefixIndex
+
+
+# Единицы измерения, которые отделяются от названия вместе с количеством
+RU_UNITS = {
+    'г': 'g', 'гр': 'g', 'грамм': 'g', 'грамма': 'g', 'граммов': 'g',
+    'кг': 'kg', 'мл': 'ml', 'л': 'l',
+    'шт': 'pcs', 'штук': 'pcs', 'штуки': 'pcs', 'штука': 'pcs',
+    'стакан': 'cup', 'стакана': 'cup', 'стаканов': 'cup',
+    'ложка': 'tbsp', 'ложки': 'tbsp', 'ложек': 'tbsp',
+    'кусок': 'slice', 'куска': 'slice', 'кусков': 'slice'
+}
+EN_UNITS = {
+    'g': 'g', 'gram': 'g', 'grams': 'g', 'kg': 'kg', 'ml': 'ml', 'l': 'l',
+    'pcs': 'pcs', 'piece': 'pcs', 'pieces': 'pcs',
+    'cup': 'cup', 'cups': 'cup',
+    'tablespoon': 'tbsp', 'tablespoons': 'tbsp', 'tbsp': 'tbsp',
+    'slice': 'slice', 'slices': 'slice'
+}
+UNIT_NAMES = {'pcs': '', 'tbsp': 'tablespoon'}
+# Единицы для подсказок: русское название и количество по умолчанию
+RU_UNIT_NAMES = {
+    'g': 'г', 'kg': 'кг', 'ml': 'мл', 'l': 'л',
+    'pcs': 'шт', 'cup': 'стакан', 'tbsp': 'ложка', 'slice': 'кусок'
+}
+DEFAULT_QUANTITIES = {'g': 100, 'ml': 200}
+
+
+def parse_phrase(text: str, units: dict) -> tuple:
+    """
+    Отделяет от фразы количество и единицу измерения и нормализует остаток.
+
+    Parameters
+    ----------
+    text : str
+        Исходная фраза (например, '200 г творога').
+    units : dict
+        Словарь единиц измерения языка фразы.
+
+    Returns
+    -------
+    tuple
+        Количество (float или None), единица ('' если нет) и нормализованная фраза.
+    """
+    tokens = [token.lower() for token in split_tokens(text) if token[0].isalnum()]
+    quantity = None
+    unit = ''
+
+    if tokens and tokens[0].replace(',', '.').replace('.', '', 1).isdigit():
+        quantity = float(tokens.pop(0).replace(',', '.'))
+        if tokens and tokens[0] in units:
+            unit = units[tokens.pop(0)]
+
+    return quantity, unit, ' '.join(tokens)
+
+
+def format_quantity(quantity: float | None, unit: str) -> str:
+    """
+    Форматирует количество и единицу измерения для запроса к английскому API.
+
+    Parameters
+    ----------
+    quantity : float | None
+        Количество.
+    unit : str
+        Единица измерения.
+
+    Returns
+    -------
+    str
+        Строка вида '200 g ' либо пустая строка.
+    """
+    if quantity is None:
+        return ''
+
+    unit_name = UNIT_NAMES.get(unit, unit)
+    return f'{quantity:g} {unit_name} ' if unit_name else f'{quantity:g} '
+
+
+class Phrasebook:
+    """
+    Словарь фраз RU -> EN, пополняемый по успешным запросам к внешним API.
+
+    Фразы хранятся без количества и единиц измерения, поэтому '2 яблока'
+    и '5 яблок' с одинаковой формой слова используют одну запись. Для частичного
+    совпадения используется индекс слово -> фразы, содержащие это слово.
+
+    Parameters
+    ----------
+    path : str
+        Путь к JSONL-файлу словаря.
+    """
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries = None
+        self._token_index = {}
+        self._suggestions = None
+
+    @property
+    def entries(self) -> dict:
+        """
+        Записи словаря (kind, фраза) -> запись; загружаются с диска при первом обращении.
+        """
+        if self._entries is None:
+            self._entries = {}
+            self._load()
+
+        return self._entries
+
+    @property
+    def suggestions(self) -> dict:
+        """
+        Префиксные индексы подсказок kind -> PrefixIndex по выученным фразам;
+        строятся при первом обращении.
+
+        В подсказки попадают только фразы с сохранённым результатом, чтобы выбранная
+        подсказка учитывалась без обращения к переводчику и внешним API.
+        """
+        if self._suggestions is None:
+            scores = {key: entry['hits'] for key, entry in self.entries.items() if entry['values']}
+
+            self._suggestions = {'food': PrefixIndex(), 'workout': PrefixIndex()}
+            for kind, index in self._suggestions.items():
+                index.extend((key, hits) for key, hits in scores.items() if key[0] == kind)
+
+        return self._suggestions
+
+    def _rank(self, key: tuple, hits: int) -> None:
+        """
+        Обновляет популярность фразы в индексе подсказок, если он уже построен.
+
+        Parameters
+        ----------
+        key : tuple
+            Ключ записи (kind, фраза).
+        hits : int
+            Число обращений.
+
+        Returns
+        -------
+        None
+        """
+        if self._suggestions is not None:
+            self._suggestions.setdefault(key[0], PrefixIndex()).update(key, hits)
+
+    def _load(self) -> None:
+        """
+        Загружает словарь из файла; более поздние строки перекрывают ранние.
+
+        Returns
+        -------
+        None
+        """
+        try:
+            with open(self.path, 'r', encoding='UTF-8') as file:
+                for line in file:
+                    self._add(json.loads(line))
+        except FileNotFoundError:
+            return
+
+    def _add(self, entry: dict) -> None:
+        """
+        Добавляет запись в словарь и индекс слов.
+
+        Parameters
+        ----------
+        entry : dict
+            Запись словаря.
+
+        Returns
+        -------
+        None
+        """
+        key = (entry['kind'], entry['phrase'])
+        self._entries[key] = entry
+        for token in entry['phrase'].split():
+            self._token_index.setdefault(token, set()).add(key)
+
+    def _remove(self, key: tuple) -> None:
+        """
+        Удаляет запись из словаря и индекса слов.
+
+        Parameters
+        ----------
+        key : tuple
+            Ключ записи (kind, фраза).
+
+        Returns
+        -------
+        None
+        """
+        if self._entries.pop(key, None) is None:
+            return
+        if self._suggestions is not None and key[0] in self._suggestions:
+            self._suggestions[key[0]].remove(key)
+        for token in key[1].split():
+            keys = self._token_index.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._token_index[token]
+
+    def _append(self, entry: dict) -> None:
+        """
+        Дописывает запись в файл словаря.
+
+        Parameters
+        ----------
+        entry : dict
+            Запись словаря.
+
+        Returns
+        -------
+        None
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'a', encoding='UTF-8') as file:
+            file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+    def lookup(self, kind: str, text: str) -> tuple:
+        """
+        Ищет перевод фразы без обращения к переводчику.
+
+        Сначала ищется точное совпадение фразы без количества, затем фраза
+        собирается из отдельных слов, известных словарю или локальному словарю RU -> EN.
+
+        Parameters
+        ----------
+        kind : str
+            Тип запроса ('food' или 'workout').
+        text : str
+            Исходная фраза.
+
+        Returns
+        -------
+        tuple
+            Английский запрос (или None) и найденная запись (или None при частичном совпадении).
+        """
+        quantity, unit, phrase = parse_phrase(text, RU_UNITS)
+        if not phrase:
+            return None, None
+
+        entry = self.entries.get((kind, phrase))
+        if entry is not None:
+            entry['hits'] += 1
+            self._rank((kind, phrase), entry['hits'])
+            return format_quantity(quantity, unit) + entry['english'], entry
+
+        # Частичное совпадение: покрываем слова запроса известными фразами, начиная с самых длинных
+        tokens = phrase.split()
+        candidates = sorted(
+            {key[1] for token in tokens for key in self._token_index.get(token, ()) if key[0] == kind},
+            key=lambda candidate: -len(candidate.split())
+        )
+
+        words = []
+        i = 0
+        while i < len(tokens):
+            for candidate in candidates:
+                candidate_tokens = candidate.split()
+                if tokens[i:i + len(candidate_tokens)] == candidate_tokens:
+                    words.append(self.entries[(kind, candidate)]['english'])
+                    i += len(candidate_tokens)
+                    break
+            else:
+                token = tokens[i]
+                if token in RU_EN_DICTIONARY:
+                    words.append(RU_EN_DICTIONARY[token])
+                elif token.isascii():
+                    words.append(token)
+                else:
+                    return None, None
+                i += 1
+
+        return format_quantity(quantity, unit) + join_tokens(words), None
+
+    def estimate(self, entry: dict | None, text: str) -> list | None:
+        """
+        Пересчитывает сохранённый результат записи на количество из фразы.
+
+        Parameters
+        ----------
+        entry : dict | None
+            Запись словаря, найденная lookup.
+        text : str
+            Исходная фраза пользователя.
+
+        Returns
+        -------
+        list | None
+            Результат для указанного количества либо None, если записи нет
+            или единица измерения во фразе отличается от сохранённой.
+        """
+        if entry is None or not entry['values']:
+            return None
+
+        quantity, unit, _ = parse_phrase(text, RU_UNITS)
+        if unit != entry['unit']:
+            return None
+
+        return [value * (quantity or 1) for value in entry['values']]
+
+    def suggest(self, text: str, limit: int = 10) -> list:
+        """
+        Подсказывает фразы, начинающиеся с введённого текста, в порядке популярности.
+
+        Parameters
+        ----------
+        text : str
+            Начало фразы без количества.
+        limit : int
+            Максимальное количество подсказок.
+
+        Returns
+        -------
+        list
+            Тройки (kind, фраза, запись словаря).
+        """
+        prefix = ' '.join(text.lower().split())
+
+        found = []
+        for index in self.suggestions.values():
+            found.extend(index.search(prefix, limit=limit))
+        found.sort(key=lambda item: -item[1])
+
+        return [(kind, phrase, self.entries.get((kind, phrase))) for (kind, phrase), _ in found[:limit]]
+
+    def learn(self, kind: str, text: str, english: str, values: list) -> None:
+        """
+        Запоминает успешный перевод фразы и результат, к которому он привёл.
+
+        Parameters
+        ----------
+        kind : str
+            Тип запроса ('food' или 'workout').
+        text : str
+            Исходная фраза пользователя.
+        english : str
+            Английский запрос, по которому внешний API вернул результат.
+        values : list
+            Результат в пересчёте на единицу количества (пищевая ценность либо ккал на кг в минуту).
+
+        Returns
+        -------
+        None
+        """
+        quantity, unit, phrase = parse_phrase(text, RU_UNITS)
+        _, _, english_phrase = parse_phrase(english, EN_UNITS)
+        if not phrase or not english_phrase or phrase == english_phrase:
+            return
+
+        previous = self.entries.get((kind, phrase))
+        entry = {
+            'kind': kind,
+            'phrase': phrase,
+            'english': english_phrase,
+            'unit': unit,
+            'values': [round(value / (quantity or 1), 4) for value in values],
+            'hits': previous['hits'] if previous else 0,
+            'updated': int(time.time())
+        }
+
+        if previous is not None and all(previous[field] == entry[field] for field in ('english', 'unit', 'values')):
+            return
+
+        self._add(entry)
+        self._append(entry)
+        self._rank((kind, phrase), entry['hits'])
+
+    def prune(self, kind: str | None = None, phrases: list | None = None, min_hits: int | None = None) -> int:
+        """
+        Удаляет записи по фразам и/или с числом обращений меньше порога и перезаписывает файл.
+
+        Parameters
+        ----------
+        kind : str | None
+            Тип удаляемых записей; None — любые.
+        phrases : list | None
+            Фразы для удаления.
+        min_hits : int | None
+            Удалить записи, использованные меньше указанного числа раз.
+
+        Returns
+        -------
+        int
+            Количество удалённых записей.
+        """
+        normalized = {parse_phrase(phrase, RU_UNITS)[2] for phrase in phrases or []}
+        removed = [
+            key for key, entry in self.entries.items()
+            if (kind is None or key[0] == kind)
+            and (key[1] in normalized or (min_hits is not None and entry['hits'] < min_hits))
+        ]
+
+        for key in removed:
+            self._remove(key)
+
+        self.save()
+
+        return len(removed)
+
+    def save(self) -> None:
+        """
+        Перезаписывает файл словаря текущими записями (включая счётчики обращений).
+
+        Returns
+        -------
+        None
+        """
+        if self._entries is None:
+            return
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='UTF-8') as file:
+            for entry in self._entries.values():
+                file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+        os.replace(tmp_path, self.path)
+
+
+phrasebook = Phrasebook(path=PHRASEBOOK_PATH)
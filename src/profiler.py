@@ -0,0 +1,247 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import threading
+import statistics
+from collections import Counter
+from config.conifg import (
+    DIAGNOSTICS_DIR,
+    PROFILE_INTERVAL_MS,
+    LOOP_LAG_THRESHOLD_MS
+)
+
+
+_SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+_HANDLERS_DIR = os.path.join(_SRC_DIR, 'handlers')
+
+
+def _frame_name(frame) -> str:
+    """
+    Возвращает имя кадра стека вида 'файл:функция'.
+    """
+    return f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}'
+
+
+def _culprit(frame) -> str:
+    """
+    Определяет, какой код бота выполняется в кадре: обработчик либо другая функция из src.
+
+    Parameters
+    ----------
+    frame : FrameType
+        Верхний кадр стека потока цикла событий.
+
+    Returns
+    -------
+    str
+        Имя обработчика, функции из src либо '<other>'.
+    """
+    project_frame = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_HANDLERS_DIR):
+            return _frame_name(frame)
+        if project_frame is None and filename.startswith(_SRC_DIR) and filename != __file__:
+            project_frame = frame
+        frame = frame.f_back
+
+    return _frame_name(project_frame) if project_frame is not None else '<other>'
+
+
+class Profiler:
+    """
+    Семплирующий профилировщик, запускаемый в работающем боте на заданное время.
+
+    Отдельный поток с заданным интервалом снимает стеки всех потоков через
+    sys._current_frames и копит их в свёрнутом виде (формат flamegraph.pl
+    и speedscope). Одновременно задача в цикле событий отмечает пульс: если пульс
+    задерживается дольше порога, поток семплирования приписывает задержку коду,
+    который в этот момент выполняется в цикле событий (обработчику из src/handlers).
+
+    Parameters
+    ----------
+    interval : float
+        Интервал семплирования в секундах.
+    lag_threshold : float
+        Задержка цикла событий в секундах, начиная с которой она приписывается обработчику.
+    """
+    def __init__(self, interval: float, lag_threshold: float) -> None:
+        self.interval = interval
+        self.lag_threshold = lag_threshold
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, seconds: float) -> asyncio.Task:
+        """
+        Запускает профилирование в фоне.
+
+        Parameters
+        ----------
+        seconds : float
+            Длительность профилирования.
+
+        Returns
+        -------
+        asyncio.Task
+            Задача, возвращающая сводку (см. run).
+
+        Raises
+        ------
+        RuntimeError
+            Если профилирование уже запущено.
+        """
+        if self.running:
+            raise RuntimeError('Профилирование уже запущено')
+
+        self._task = asyncio.create_task(self.run(seconds))
+
+        return self._task
+
+    async def run(self, seconds: float) -> dict:
+        """
+        Профилирует процесс заданное время и записывает результаты в директорию диагностики.
+
+        Parameters
+        ----------
+        seconds : float
+            Длительность профилирования.
+
+        Returns
+        -------
+        dict
+            Сводка: пути к файлам, число семплов, задержки цикла событий и их виновники.
+        """
+        loop_thread = threading.get_ident()
+        stacks = Counter()
+        blocked = Counter()
+        lags = []
+        state = {'beat': time.monotonic()}
+        stop = threading.Event()
+
+        def sample() -> None:
+            own_thread = threading.get_ident()
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            while not stop.wait(self.interval):
+                frames = sys._current_frames()
+                for thread_id, frame in frames.items():
+                    if thread_id == own_thread:
+                        continue
+                    stack = []
+                    leaf = frame
+                    while frame is not None:
+                        stack.append(_frame_name(frame))
+                        frame = frame.f_back
+                    thread_name = names.get(thread_id) or str(thread_id)
+                    stacks[';'.join([thread_name, *reversed(stack)])] += 1
+
+                    if thread_id == loop_thread and time.monotonic() - state['beat'] > self.lag_threshold:
+                        blocked[_culprit(leaf)] += 1
+
+                if len(names) != threading.active_count():
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+
+        sampler = threading.Thread(target=sample, name='profiler', daemon=True)
+        started = time.time()
+        sampler.start()
+
+        try:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                expected = time.monotonic() + self.interval
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                lags.append(max(0.0, now - expected))
+                state['beat'] = now
+        finally:
+            stop.set()
+            await asyncio.to_thread(sampler.join)
+
+        summary = {
+            'seconds': seconds,
+            'samples': sum(stacks.values()),
+            'lag_ms': {
+                'p50': round(statistics.median(lags) * 1000, 1) if lags else 0.0,
+                'p99': round(sorted(lags)[int(len(lags) * 0.99) - 1] * 1000, 1) if lags else 0.0,
+                'max': round(max(lags) * 1000, 1) if lags else 0.0
+            },
+            # Время блокировки цикла событий сверх порога, приписанное коду, который его занимал
+            'blocked_ms': {
+                culprit: round(count * self.interval * 1000)
+                for culprit, count in blocked.most_common()
+            }
+        }
+        summary.update(await asyncio.to_thread(self._export, started, stacks, summary))
+
+        return summary
+
+    @staticmethod
+    def _export(started: float, stacks: Counter, summary: dict) -> dict:
+        """
+        Записывает свёрнутые стеки и сводку задержек в директорию диагностики.
+
+        Parameters
+        ----------
+        started : float
+            Время начала профилирования (unix time).
+        stacks : Counter
+            Число семплов по свёрнутым стекам.
+        summary : dict
+            Сводка задержек цикла событий.
+
+        Returns
+        -------
+        dict
+            Пути к записанным файлам.
+        """
+        os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+        name = time.strftime('%Y%m%d-%H%M%S', time.localtime(started))
+        stacks_path = os.path.join(DIAGNOSTICS_DIR, f'profile-{name}.collapsed')
+        lag_path = os.path.join(DIAGNOSTICS_DIR, f'loop-lag-{name}.json')
+
+        with open(stacks_path, 'w', encoding='UTF-8') as file:
+            for stack, count in stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+        with open(lag_path, 'w', encoding='UTF-8') as file:
+            json.dump(summary, file, ensure_ascii=False, indent=2)
+
+        return {'stacks_path': stacks_path, 'lag_path': lag_path}
+
+
+def format_summary(summary: dict) -> str:
+    """
+    Формирует текстовую сводку профилирования.
+
+    Parameters
+    ----------
+    summary : dict
+        Сводка, возвращённая Profiler.run.
+
+    Returns
+    -------
+    str
+        Текст сводки.
+    """
+    lag = summary['lag_ms']
+    lines = [
+        f'Профилирование {summary["seconds"]} с завершено, семплов: {summary["samples"]}.',
+        f'Задержка цикла событий: p50 {lag["p50"]} мс, p99 {lag["p99"]} мс, max {lag["max"]} мс.'
+    ]
+
+    if summary['blocked_ms']:
+        lines.append('Блокировали цикл событий:')
+        lines.extend(f'- {culprit}: {ms} мс' for culprit, ms in list(summary['blocked_ms'].items())[:10])
+
+    lines.append(f'Стеки: {summary["stacks_path"]}')
+    lines.append(f'Задержки: {summary["lag_path"]}')
+
+    return '\n'.join(lines)
+
+
+profiler = Profiler(interval=PROFILE_INTERVAL_MS / 1000, lag_threshold=LOOP_LAG_THRESHOLD_MS / 1000)
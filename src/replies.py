@@ -0,0 +1,139 @@
+from src.states import UserRecord, Nutrients
+
+
+def format_profile(user_data: UserRecord) -> str:
+    """
+    Формирует ответ на '/list_profile'.
+
+    Parameters
+    ----------
+    user_data : UserRecord
+        Запись о пользователе.
+
+    Returns
+    -------
+    str
+        Текст ответа.
+    """
+    return (
+        'Ваш профиль:\n\n'
+        f'Вес: {user_data.weight} кг\n'
+        f'Рост: {user_data.height} см\n'
+        f'Возраст: {user_data.age} лет\n'
+        f'Активность: {user_data.activity_level} минут\n'
+        f'Город: {user_data.city}\n'
+        f'Цель по калориям: {user_data.calorie_goal} ккал\n'
+        f'Цель по воде: {user_data.water_goal} мл\n'
+    )
+
+
+def format_water(user_data: UserRecord, water_amount: int) -> str:
+    """
+    Формирует ответ на '/log_water'.
+
+    Parameters
+    ----------
+    user_data : UserRecord
+        Запись о пользователе после добавления воды.
+    water_amount : int
+        Добавленное количество воды в мл.
+
+    Returns
+    -------
+    str
+        Текст ответа.
+    """
+    if user_data.water_goal > user_data.logged_water:
+        return (
+            f'Добавлено: {water_amount} мл воды.\n'
+            f'До достижения цели осталось {user_data.water_goal - user_data.logged_water} мл.'
+        )
+
+    return f'Добавлено: {water_amount} мл воды. Вы достигли дневной цели!'
+
+
+def format_food(user_data: UserRecord, nutrients: Nutrients) -> str:
+    """
+    Формирует ответ на '/log_food'.
+
+    Parameters
+    ----------
+    user_data : UserRecord
+        Запись о пользователе после добавления еды.
+    nutrients : Nutrients
+        Пищевая ценность добавленной еды.
+
+    Returns
+    -------
+    str
+        Текст ответа.
+    """
+    added = (
+        f'Добавлено: {nutrients.calories} ккал '
+        f'(Б {nutrients.protein:.1f} г, Ж {nutrients.fat:.1f} г, У {nutrients.carbohydrates:.1f} г).'
+    )
+
+    if user_data.calorie_goal > user_data.logged_calories:
+        return (
+            f'{added}\n'
+            f'До достижения цели осталось {user_data.calorie_goal - user_data.logged_calories} ккал.'
+        )
+
+    return f'{added} Вы достигли дневной цели!'
+
+
+def format_workout(user_data: UserRecord, burned_calories: int) -> str:
+    """
+    Формирует ответ на '/log_workout'.
+
+    Parameters
+    ----------
+    user_data : UserRecord
+        Запись о пользователе после добавления тренировки.
+    burned_calories : int
+        Сожжённые калории.
+
+    Returns
+    -------
+    str
+        Текст ответа.
+    """
+    if user_data.calorie_goal > user_data.logged_calories:
+        return (
+            f'Сожжено: {burned_calories} ккал.\n'
+            f'До достижения цели осталось {user_data.calorie_goal - user_data.logged_calories} ккал.'
+        )
+
+    return f'Сожжено: {burned_calories} ккал. Вы достигли дневной цели!'
+
+
+def format_progress(user_data: UserRecord) -> str:
+    """
+    Формирует ответ на '/check_progress'.
+
+    Parameters
+    ----------
+    user_data : UserRecord
+        Запись о пользователе.
+
+    Returns
+    -------
+    str
+        Текст ответа.
+    """
+    return (
+        '📊 Прогресс:\n\n'
+        'Вода:\n'
+        f'- Выпито: {user_data.logged_water} мл. из {user_data.water_goal} мл.\n'
+        f'- Осталось: {user_data.water_goal - user_data.logged_water} мл.\n'
+        'Калории:\n'
+        f'- Потреблено: {user_data.logged_calories} ккал. из {user_data.calorie_goal} ккал.\n'
+        f'- Сожжено: {user_data.burned_calories} ккал.\n'
+        f'- Осталось: {user_data.calorie_goal - user_data.logged_calories} ккал.\n'
+        'Макронутриенты:\n'
+        f'- Белки: {user_data.logged_protein:.1f} г.\n'
+        f'- Жиры: {user_data.logged_fat:.1f} г.\n'
+        f'- Углеводы: {user_data.logged_carbohydrates:.1f} г.\n'
+        f'- Клетчатка: {user_data.logged_fiber:.1f} г.\n'
+        f'- Сахар: {user_data.logged_sugar:.1f} г.\n'
+    )
@@ -1,20 +1,52 @@
-from pydantic import BaseModel
+import struct
+from typing import Literal, NamedTuple
+from pydantic import BaseModel, Field
 from aiogram.fsm.state import State, StatesGroup
 
 
+# Границы полей бинарной записи: H для веса, роста и возраста, B для активности, i для целей и прогресса
+_UINT16_MAX = 2 ** 16 - 1
+_UINT8_MAX = 2 ** 8 - 1
+_INT32_MIN = -2 ** 31
+_INT32_MAX = 2 ** 31 - 1
+
+
 class UserState(BaseModel):
     user_id: int
-    sex: str
-    weight: int
-    height: int
-    age: int
-    activity_level: int
+    sex: Literal['male', 'female']
+    weight: int = Field(ge=0, le=_UINT16_MAX)
+    height: int = Field(ge=0, le=_UINT16_MAX)
+    age: int = Field(ge=0, le=_UINT16_MAX)
+    activity_level: int = Field(ge=0, le=_UINT8_MAX)
     city: str
-    calorie_goal: int
-    water_goal: int
-    logged_water: int
-    logged_calories: int
-    burned_calories: int
+    calorie_goal: int = Field(ge=_INT32_MIN, le=_INT32_MAX)
+    water_goal: int = Field(ge=_INT32_MIN, le=_INT32_MAX)
+    logged_water: int = Field(ge=_INT32_MIN, le=_INT32_MAX)
+    logged_calories: int = Field(ge=_INT32_MIN, le=_INT32_MAX)
+    burned_calories: int = Field(ge=_INT32_MIN, le=_INT32_MAX)
+    logged_protein: float = 0.0
+    logged_fat: float = 0.0
+    logged_carbohydrates: float = 0.0
+    logged_fiber: float = 0.0
+    logged_sugar: float = 0.0
+
+
+class RecordEncodeError(ValueError):
+    """
+    Значение профиля не помещается в поле бинарной записи.
+    """
+
+
+class Nutrients(NamedTuple):
+    """
+    Пищевая ценность порции: калории (ккал) и макронутриенты (г).
+    """
+    calories: int
+    protein: float = 0.0
+    fat: float = 0.0
+    carbohydrates: float = 0.0
+    fiber: float = 0.0
+    sugar: float = 0.0
 
 
 class ParametersState(StatesGroup):
@@ -27,3 +59,270 @@ class ParametersState(StatesGroup):
     calorie_goal = State()
     water_goal = State()
     saving_parameters = State()
+
+
+# Названия шагов настройки профиля для напоминаний о незавершённой настройке
+PARAMETERS_STEPS = {
+    ParametersState.sex.state: 'выбор пола',
+    ParametersState.weight.state: 'ввод веса',
+    ParametersState.height.state: 'ввод роста',
+    ParametersState.age.state: 'ввод возраста',
+    ParametersState.activity_level.state: 'ввод уровня активности',
+    ParametersState.city.state: 'ввод города',
+    ParametersState.calorie_goal.state: 'ввод цели по калориям',
+    ParametersState.water_goal.state: 'ввод цели по воде'
+}
+
+
+# Версия, пол, user_id, вес, рост, возраст, активность, цели, прогресс, длина названия города
+_RECORD_HEADER_V1 = struct.Struct('<BBqHHHBiiiiiH')
+# То же, что и в версии 1, плюс суммы макронутриентов (г) перед длиной названия города
+_RECORD_HEADER = struct.Struct('<BBqHHHBiiiii5fH')
+_RECORD_VERSION = 2
+_SEX_CODES = {'male': 0, 'female': 1}
+_SEX_NAMES = {code: sex for sex, code in _SEX_CODES.items()}
+
+
+class UserRecord:
+    """
+    Компактное представление профиля пользователя для горячего пути.
+
+    В отличие от UserState не выполняет валидацию: объекты создаются либо из
+    уже проверенного UserState, либо из бинарного формата, записанного ботом.
+    """
+    __slots__ = (
+        'user_id',
+        'sex',
+        'weight',
+        'height',
+        'age',
+        'activity_level',
+        'city',
+        'calorie_goal',
+        'water_goal',
+        'logged_water',
+        'logged_calories',
+        'burned_calories',
+        'logged_protein',
+        'logged_fat',
+        'logged_carbohydrates',
+        'logged_fiber',
+        'logged_sugar'
+    )
+
+    def __init__(
+            self,
+            user_id: int,
+            sex: str,
+            weight: int,
+            height: int,
+            age: int,
+            activity_level: int,
+            city: str,
+            calorie_goal: int,
+            water_goal: int,
+            logged_water: int,
+            logged_calories: int,
+            burned_calories: int,
+            logged_protein: float = 0.0,
+            logged_fat: float = 0.0,
+            logged_carbohydrates: float = 0.0,
+            logged_fiber: float = 0.0,
+            logged_sugar: float = 0.0
+    ) -> None:
+        self.user_id = user_id
+        self.sex = sex
+        self.weight = weight
+        self.height = height
+        self.age = age
+        self.activity_level = activity_level
+        self.city = city
+        self.calorie_goal = calorie_goal
+        self.water_goal = water_goal
+        self.logged_water = logged_water
+        self.logged_calories = logged_calories
+        self.burned_calories = burned_calories
+        self.logged_protein = logged_protein
+        self.logged_fat = logged_fat
+        self.logged_carbohydrates = logged_carbohydrates
+        self.logged_fiber = logged_fiber
+        self.logged_sugar = logged_sugar
+
+    def add_nutrients(self, nutrients: Nutrients) -> None:
+        """
+        Добавляет пищевую ценность порции к дневным суммам.
+
+        Parameters
+        ----------
+        nutrients : Nutrients
+            Пищевая ценность порции.
+
+        Returns
+        -------
+        None
+        """
+        self.logged_calories += nutrients.calories
+        self.logged_protein += nutrients.protein
+        self.logged_fat += nutrients.fat
+        self.logged_carbohydrates += nutrients.carbohydrates
+        self.logged_fiber += nutrients.fiber
+        self.logged_sugar += nutrients.sugar
+
+    def clear_progress(self) -> None:
+        """
+        Обнуляет дневной прогресс по воде, калориям и макронутриентам.
+
+        Returns
+        -------
+        None
+        """
+        self.logged_water = 0
+        self.logged_calories = 0
+        self.burned_calories = 0
+        self.logged_protein = 0.0
+        self.logged_fat = 0.0
+        self.logged_carbohydrates = 0.0
+        self.logged_fiber = 0.0
+        self.logged_sugar = 0.0
+
+    @classmethod
+    def from_state(cls, user_state: UserState) -> 'UserRecord':
+        """
+        Создаёт запись из провалидированной модели UserState.
+
+        Parameters
+        ----------
+        user_state : UserState
+            Провалидированная информация о пользователе.
+
+        Returns
+        -------
+        UserRecord
+            Компактная запись о пользователе.
+        """
+        return cls(**user_state.model_dump())
+
+    def to_state(self) -> UserState:
+        """
+        Преобразует запись в модель UserState (с валидацией).
+
+        Returns
+        -------
+        UserState
+            Информация о пользователе.
+        """
+        return UserState(**self.to_dict())
+
+    def to_dict(self) -> dict:
+        """
+        Возвращает поля записи в виде словаря.
+
+        Returns
+        -------
+        dict
+            Словарь с информацией о пользователе.
+        """
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    def pack(self) -> bytes:
+        """
+        Кодирует запись в компактный бинарный формат.
+
+        Returns
+        -------
+        bytes
+            Бинарное представление записи.
+
+        Raises
+        ------
+        RecordEncodeError
+            Если значение поля не помещается в бинарный формат.
+        """
+        city = self.city.encode('UTF-8')
+        if self.sex not in _SEX_CODES:
+            raise RecordEncodeError(f'Неизвестный пол: {self.sex!r}')
+
+        try:
+            header = _RECORD_HEADER.pack(
+                _RECORD_VERSION,
+                _SEX_CODES[self.sex],
+                self.user_id,
+                self.weight,
+                self.height,
+                self.age,
+                self.activity_level,
+                self.calorie_goal,
+                self.water_goal,
+                self.logged_water,
+                self.logged_calories,
+                self.burned_calories,
+                self.logged_protein,
+                self.logged_fat,
+                self.logged_carbohydrates,
+                self.logged_fiber,
+                self.logged_sugar,
+                len(city)
+            )
+        except struct.error as e:
+            raise RecordEncodeError(f'Значение не помещается в запись: {e}') from e
+
+        return header + city
+
+    @classmethod
+    def unpack(cls, data: bytes) -> 'UserRecord':
+        """
+        Декодирует запись из бинарного формата.
+
+        Parameters
+        ----------
+        data : bytes
+            Бинарное представление записи.
+
+        Returns
+        -------
+        UserRecord
+            Компактная запись о пользователе.
+        """
+        if data[0] == 1:
+            fields = _RECORD_HEADER_V1.unpack_from(data)
+            macros = (0.0,) * 5
+            offset = _RECORD_HEADER_V1.size
+        elif data[0] == _RECORD_VERSION:
+            fields = _RECORD_HEADER.unpack_from(data)
+            macros = fields[12:17]
+            offset = _RECORD_HEADER.size
+        else:
+            raise ValueError(f'Неизвестная версия записи: {data[0]}')
+
+        (
+            _,
+            sex,
+            user_id,
+            weight,
+            height,
+            age,
+            activity_level,
+            calorie_goal,
+            water_goal,
+            logged_water,
+            logged_calories,
+            burned_calories
+        ) = fields[:12]
+        city_length = fields[-1]
+        city = data[offset:offset + city_length].decode('UTF-8')
+
+        return cls(
+            user_id,
+            _SEX_NAMES[sex],
+            weight,
+            height,
+            age,
+            activity_level,
+            city,
+            calorie_goal,
+            water_goal,
+            logged_water,
+            logged_calories,
+            burned_calories,
+            *macros
+        )
@@ -0,0 +1,908 @@
+import os
+import json
+import fcntl
+import asyncio
+import time
+import struct
+import hashlib
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config.conifg import (
+    PYTHONPATH,
+    USER_CACHE_SIZE,
+    GROUP_COMMIT_WINDOW_MS,
+    WAL_CHECKPOINT_BYTES,
+    INDEX_COMPACT_MIN_ENTRIES
+)
+from src.states import UserState, UserRecord, Nutrients, RecordEncodeError
+from src.tracing import traced
+from src.wal import GroupCommitWriter, OP_REPLACE, OP_APPEND
+
+
+USERS_DIR = f'{PYTHONPATH}/users'
+INDEX_PATH = f'{USERS_DIR}/index.bin'
+WAL_PATH = f'{USERS_DIR}/wal.log'
+TENANTS_DIR = f'{USERS_DIR}/tenants'
+LOCK_PATH = f'{USERS_DIR}/storage.lock'
+
+# Запись индекса: user_id, время последнего изменения (unix time)
+_INDEX_ENTRY = struct.Struct('<qI')
+
+# Событие журнала: время (unix time), тип, количество (мл или ккал), белки, жиры, углеводы, клетчатка, сахар (г)
+_EVENT = struct.Struct('<IBi5f')
+EVENT_WATER = 0
+EVENT_FOOD = 1
+EVENT_WORKOUT = 2
+
+# Пространство имён бота, обрабатывающего обновление: '' — основной бот (users/),
+# иначе users/tenants/<tenant>/. Журнал групповой фиксации общий для всех ботов.
+current_tenant = ContextVar('tenant', default='')
+
+# LRU-кэш профилей: (tenant, user_id) -> UserRecord
+_user_cache = OrderedDict()
+# Уже созданные директории шардов
+_shard_dirs = set()
+# Индекс дописывается и из потока групповой фиксации, и из фоновой миграции
+_index_lock = threading.Lock()
+# Записей в индексе и пользователей на момент последнего уплотнения: tenant -> [записей, пользователей]
+_index_counts = {}
+# Файл монопольной блокировки хранилища, удерживаемый до завершения процесса
+_lock_file = None
+# Подписчики на новые события журнала: callback(tenant, user_id, время события)
+_event_listeners = []
+
+
+def _tenant_prefix(tenant: str | None = None) -> str:
+    """
+    Возвращает префикс путей пространства имён бота относительно users/.
+
+    Parameters
+    ----------
+    tenant : str | None
+        Пространство имён; None — текущее.
+
+    Returns
+    -------
+    str
+        Пустая строка для основного бота либо 'tenants/<tenant>/'.
+    """
+    tenant = current_tenant.get() if tenant is None else tenant
+    return f'tenants/{tenant}/' if tenant else ''
+
+
+def _tenant_root(tenant: str | None = None) -> str:
+    """
+    Возвращает корневую директорию пространства имён бота.
+
+    Parameters
+    ----------
+    tenant : str | None
+        Пространство имён; None — текущее.
+
+    Returns
+    -------
+    str
+        Путь к директории.
+    """
+    return f'{USERS_DIR}/{_tenant_prefix(tenant)}'.rstrip('/')
+
+
+def _index_path(tenant: str | None = None) -> str:
+    """
+    Возвращает путь к индексу пользователей пространства имён бота.
+
+    Parameters
+    ----------
+    tenant : str | None
+        Пространство имён; None — текущее.
+
+    Returns
+    -------
+    str
+        Путь к файлу индекса.
+    """
+    return f'{_tenant_root(tenant)}/index.bin'
+
+
+@contextmanager
+def use_tenant(tenant: str):
+    """
+    Переключает хранилище на пространство имён бота в пределах блока with.
+
+    Parameters
+    ----------
+    tenant : str
+        Пространство имён ('' — основной бот).
+    """
+    token = current_tenant.set(tenant)
+    try:
+        yield
+    finally:
+        current_tenant.reset(token)
+
+
+def iter_tenants():
+    """
+    Итерирует по пространствам имён ботов, у которых есть данные.
+
+    Yields
+    ------
+    str
+        Пространство имён ('' — основной бот).
+    """
+    yield ''
+
+    try:
+        with os.scandir(TENANTS_DIR) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    yield entry.name
+    except FileNotFoundError:
+        return
+
+
+def _shard_name(user_id: int) -> str:
+    """
+    Возвращает шард пользователя вида ab/cd.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+
+    Returns
+    -------
+    str
+        Относительный путь шарда.
+    """
+    digest = hashlib.md5(str(user_id).encode()).hexdigest()
+    return f'{digest[:2]}/{digest[2:4]}'
+
+
+def _shard_dir(user_id: int) -> str:
+    """
+    Возвращает директорию шарда пользователя вида users/ab/cd.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+
+    Returns
+    -------
+    str
+        Путь к директории шарда.
+    """
+    return f'{_tenant_root()}/{_shard_name(user_id)}'
+
+
+def _user_path(user_id: int, extension: str) -> str:
+    """
+    Возвращает путь к файлу с данными пользователя в шардированной структуре.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+    extension : str
+        Расширение файла.
+
+    Returns
+    -------
+    str
+        Путь к файлу.
+    """
+    return f'{_shard_dir(user_id)}/{user_id}.{extension}'
+
+
+def _relative_user_path(user_id: int, extension: str) -> str:
+    """
+    Возвращает путь к файлу с данными пользователя относительно users/ с учётом пространства имён бота.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+    extension : str
+        Расширение файла.
+
+    Returns
+    -------
+    str
+        Относительный путь к файлу.
+    """
+    return f'{_tenant_prefix()}{_shard_name(user_id)}/{user_id}.{extension}'
+
+
+def _flat_user_path(user_id: int, extension: str) -> str:
+    """
+    Возвращает путь к файлу с данными пользователя в старой плоской структуре.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+    extension : str
+        Расширение файла ('bin' или 'json').
+
+    Returns
+    -------
+    str
+        Путь к файлу.
+    """
+    return f'{_tenant_root()}/{user_id}.{extension}'
+
+
+def _ensure_shard_dir(user_id: int) -> None:
+    """
+    Создаёт директорию шарда пользователя, если её ещё нет.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+
+    Returns
+    -------
+    None
+    """
+    shard_dir = _shard_dir(user_id)
+    if shard_dir not in _shard_dirs:
+        os.makedirs(shard_dir, exist_ok=True)
+        _shard_dirs.add(shard_dir)
+
+
+def _append_index(entries: list, tenant: str | None = None) -> None:
+    """
+    Дописывает записи (user_id, mtime) в индекс пользователей.
+
+    Индекс дописывается при каждом сохранении профиля, поэтому, как только
+    записей становится вдвое больше, чем пользователей после прошлого уплотнения
+    (и не меньше INDEX_COMPACT_MIN_ENTRIES), он уплотняется: размер индекса
+    зависит от числа пользователей, а не от количества записей.
+
+    Parameters
+    ----------
+    entries : list
+        Список пар (user_id, mtime).
+    tenant : str | None
+        Пространство имён; None — текущее.
+
+    Returns
+    -------
+    None
+    """
+    tenant = current_tenant.get() if tenant is None else tenant
+    data = b''.join(_INDEX_ENTRY.pack(user_id, mtime) for user_id, mtime in entries)
+
+    with _index_lock:
+        with open(_index_path(tenant), 'ab') as file:
+            file.write(data)
+            size = file.tell()
+
+        counts = _index_counts.get(tenant)
+        if counts is None:
+            # Первая запись после запуска: число пользователей оценивается по размеру индекса
+            lines = size // _INDEX_ENTRY.size
+            counts = _index_counts[tenant] = [lines, lines - len(entries)]
+        else:
+            counts[0] += len(entries)
+
+        compact = counts[0] >= max(2 * counts[1], INDEX_COMPACT_MIN_ENTRIES)
+
+    if compact:
+        compact_index(tenant)
+
+
+def _index_committed(operations: list) -> None:
+    """
+    Дописывает в индекс профили, зафиксированные одной группой записи.
+
+    Parameters
+    ----------
+    operations : list
+        Список кортежей (операция, относительный путь, данные).
+
+    Returns
+    -------
+    None
+    """
+    now = int(time.time())
+    entries = {}
+    for op, path, _ in operations:
+        if op != OP_REPLACE or not path.endswith('.bin'):
+            continue
+        # Пути вида tenants/<tenant>/ab/cd/<id>.bin относятся к дополнительным ботам
+        parts = path.split('/')
+        tenant = parts[1] if parts[0] == 'tenants' else ''
+        entries.setdefault(tenant, []).append((int(parts[-1].split('.')[0]), now))
+
+    for tenant, tenant_entries in entries.items():
+        _append_index(tenant_entries, tenant=tenant)
+
+
+writer = GroupCommitWriter(
+    root=USERS_DIR,
+    wal_path=WAL_PATH,
+    window=GROUP_COMMIT_WINDOW_MS / 1000,
+    checkpoint_bytes=WAL_CHECKPOINT_BYTES,
+    on_commit=_index_committed
+)
+
+
+def iter_index(tenant: str | None = None):
+    """
+    Итерирует по индексу пользователей без обхода директорий.
+
+    Индекс дописывается при каждом сохранении, поэтому для пользователя
+    возвращается только последнее время изменения.
+
+    Parameters
+    ----------
+    tenant : str | None
+        Пространство имён; None — текущее.
+
+    Yields
+    ------
+    tuple
+        Пара (user_id, mtime).
+    """
+    latest = {}
+    try:
+        with open(_index_path(tenant), 'rb') as file:
+            while chunk := file.read(_INDEX_ENTRY.size * 4096):
+                # Последняя запись может быть дописана не полностью
+                chunk = chunk[:len(chunk) - len(chunk) % _INDEX_ENTRY.size]
+                for user_id, mtime in _INDEX_ENTRY.iter_unpack(chunk):
+                    latest[user_id] = mtime
+    except FileNotFoundError:
+        return
+
+    yield from latest.items()
+
+
+def iter_user_paths():
+    """
+    Лениво обходит шарды и возвращает пути к файлам профилей.
+
+    В отличие от iter_index не держит в памяти список пользователей,
+    поэтому подходит для массовых задач над всем хранилищем.
+    Пространство имён фиксируется при вызове: итератор можно передавать
+    в другой поток (например, в Pool.imap).
+
+    Returns
+    -------
+    Iterator
+        Пути к файлам профилей.
+    """
+    return _iter_shard_files(_tenant_root())
+
+
+def _iter_shard_files(root: str):
+    """
+    Обходит шарды директории и возвращает пути к файлам профилей.
+
+    Parameters
+    ----------
+    root : str
+        Корневая директория пространства имён.
+
+    Yields
+    ------
+    str
+        Путь к файлу профиля.
+    """
+    try:
+        top_entries = os.scandir(root)
+    except FileNotFoundError:
+        return
+
+    with top_entries:
+        for top in top_entries:
+            if not top.is_dir() or top.name == 'tenants':
+                continue
+            with os.scandir(top.path) as shard_entries:
+                for shard in shard_entries:
+                    if not shard.is_dir():
+                        continue
+                    with os.scandir(shard.path) as entries:
+                        for entry in entries:
+                            if entry.name.endswith('.bin'):
+                                yield entry.path
+
+
+def read_user_file(path: str) -> UserRecord:
+    """
+    Читает профиль пользователя из файла, минуя кэш.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу профиля.
+
+    Returns
+    -------
+    UserRecord
+        Запись о пользователе.
+    """
+    with open(path, 'rb') as file:
+        return UserRecord.unpack(file.read())
+
+
+def iter_user_records():
+    """
+    Итерирует по профилям всех пользователей из индекса, читая их с диска.
+
+    Yields
+    ------
+    UserRecord
+        Запись о пользователе.
+    """
+    for user_id, _ in iter_index():
+        try:
+            with open(_user_path(user_id, 'bin'), 'rb') as file:
+                yield UserRecord.unpack(file.read())
+        except FileNotFoundError:
+            continue
+
+
+def compact_index(tenant: str | None = None) -> None:
+    """
+    Перезаписывает индекс, оставляя по одной записи на пользователя.
+
+    Parameters
+    ----------
+    tenant : str | None
+        Пространство имён; None — текущее.
+
+    Returns
+    -------
+    None
+    """
+    tenant = current_tenant.get() if tenant is None else tenant
+    index_path = _index_path(tenant)
+    if not os.path.exists(index_path):
+        return
+
+    with _index_lock:
+        entries = sorted(iter_index(tenant))
+        tmp_path = f'{index_path}.tmp'
+
+        with open(tmp_path, 'wb') as file:
+            file.write(b''.join(_INDEX_ENTRY.pack(user_id, mtime) for user_id, mtime in entries))
+        os.replace(tmp_path, index_path)
+
+        _index_counts[tenant] = [len(entries), len(entries)]
+
+
+def compact_all_indexes() -> None:
+    """
+    Уплотняет индексы всех пространств имён ботов.
+
+    Returns
+    -------
+    None
+    """
+    for tenant in iter_tenants():
+        compact_index(tenant)
+
+
+def _move_to_shard(source: str, target: str) -> bool:
+    """
+    Атомарно переносит файл из плоской структуры в шард, не перезаписывая шард.
+
+    Жёсткая ссылка создаётся только если файла в шарде ещё нет: в отличие от
+    os.replace, файл, сохранённый в шард параллельно, не будет затёрт
+    устаревшей версией.
+
+    Parameters
+    ----------
+    source : str
+        Путь к файлу в плоской структуре.
+    target : str
+        Путь к файлу в шарде.
+
+    Returns
+    -------
+    bool
+        True, если файл перенесён; False, если в шарде уже была более новая версия.
+
+    Raises
+    ------
+    FileNotFoundError
+        Если файла в плоской структуре нет.
+    """
+    try:
+        os.link(source, target)
+        moved = True
+    except FileExistsError:
+        moved = False
+
+    try:
+        os.remove(source)
+    except FileNotFoundError:
+        # Файл параллельно перенёс другой поток
+        pass
+
+    return moved
+
+
+def migrate_flat_layout() -> int:
+    """
+    Переносит профили из плоской структуры users/<id>.* в шарды.
+
+    Может выполняться в фоне во время работы бота: каждый файл переносится
+    атомарно, а загрузка профилей проверяет обе структуры. Если профиль уже
+    сохранён в шард (пользователь обновил его до миграции), устаревший файл
+    из плоской структуры удаляется.
+
+    Returns
+    -------
+    int
+        Количество перенесённых профилей.
+    """
+    migrated = []
+
+    with os.scandir(USERS_DIR) as entries:
+        for entry in entries:
+            name, _, extension = entry.name.partition('.')
+            if not entry.is_file() or extension not in ('bin', 'json') or not name.isdigit():
+                continue
+
+            user_id = int(name)
+            mtime = int(entry.stat().st_mtime)
+            _ensure_shard_dir(user_id)
+            if _move_to_shard(entry.path, _user_path(user_id, extension)):
+                migrated.append((user_id, mtime))
+
+    if migrated:
+        _append_index(migrated)
+        compact_index()
+
+    return len(migrated)
+
+
+def add_event_listener(callback) -> None:
+    """
+    Подписывает функцию на события журнала, зафиксированные save_user_data.
+
+    Parameters
+    ----------
+    callback : Callable
+        Функция callback(tenant, user_id, время события), вызываемая после фиксации.
+
+    Returns
+    -------
+    None
+    """
+    _event_listeners.append(callback)
+
+
+def _cache_user(user_data: UserRecord) -> None:
+    """
+    Помещает запись в LRU-кэш, вытесняя самые старые записи.
+
+    Parameters
+    ----------
+    user_data : UserRecord
+        Запись о пользователе.
+
+    Returns
+    -------
+    None
+    """
+    key = (current_tenant.get(), user_data.user_id)
+    _user_cache[key] = user_data
+    _user_cache.move_to_end(key)
+
+    while len(_user_cache) > USER_CACHE_SIZE:
+        _user_cache.popitem(last=False)
+
+
+@traced('save_user_data')
+async def save_user_data(user_data: UserState | UserRecord, event: tuple | None = None) -> None:
+    """
+    Сохраняет информацию о пользователе в бинарный файл.
+
+    Запись фиксируется группой вместе с записями других обработчиков;
+    функция возвращает управление только после fsync журнала.
+
+    Parameters
+    ----------
+    user_data : UserState | UserRecord
+        Объект, содержащий информацию о пользователе.
+    event : tuple | None
+        Событие журнала (тип, количество[, пищевая ценность[, время]]), фиксируемое вместе с профилем.
+
+    Returns
+    -------
+    None
+
+    Raises
+    ------
+    RecordEncodeError
+        Если значение профиля не помещается в бинарный формат; профиль не сохраняется.
+    """
+    if isinstance(user_data, UserState):
+        user_data = UserRecord.from_state(user_data)
+
+    try:
+        operations = [(OP_REPLACE, _relative_user_path(user_data.user_id, 'bin'), user_data.pack())]
+        if event is not None:
+            operations.append(_event_operation(user_data.user_id, *event))
+    except RecordEncodeError:
+        # Обработчики изменяют запись из кэша на месте: запись, которую нельзя сохранить,
+        # вытесняется, и следующее чтение вернёт последнюю сохранённую версию
+        _user_cache.pop((current_tenant.get(), user_data.user_id), None)
+        raise
+
+    _cache_user(user_data)
+
+    await writer.write(operations)
+
+    if event is not None:
+        at = event[3] if len(event) > 3 and event[3] is not None else int(time.time())
+        for listener in _event_listeners:
+            listener(current_tenant.get(), user_data.user_id, at)
+
+
+def _write_durable(path: str, payload: bytes) -> None:
+    """
+    Атомарно записывает файл с fsync в обход группового журнала.
+
+    Parameters
+    ----------
+    path : str
+        Путь к файлу.
+    payload : bytes
+        Содержимое файла.
+
+    Returns
+    -------
+    None
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(payload)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_path, path)
+
+
+@traced('load_user_data')
+def load_user_data(user_id: int) -> UserRecord:
+    """
+    Загружает информацию о пользователе из кэша или с диска.
+
+    Профили из плоской структуры переносятся в шард при первом обращении,
+    профили в старом JSON-формате проходят валидацию UserState
+    и конвертируются в бинарный формат.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+
+    Returns
+    -------
+    UserRecord
+        Объект, содержащий информацию о пользователе.
+
+    Raises
+    ------
+    FileNotFoundError
+        Если профиль пользователя не найден.
+    """
+    key = (current_tenant.get(), user_id)
+    user_data = _user_cache.get(key)
+    if user_data is not None:
+        _user_cache.move_to_end(key)
+        return user_data
+
+    pending = writer.pending(_relative_user_path(user_id, 'bin'))
+    if pending is not None:
+        user_data = UserRecord.unpack(pending)
+        _cache_user(user_data)
+        return user_data
+
+    user_data = _read_user_file(user_id)
+    _cache_user(user_data)
+
+    return user_data
+
+
+def _read_user_file(user_id: int) -> UserRecord:
+    """
+    Читает профиль пользователя с диска из шарда либо из плоской структуры.
+
+    Фоновая миграция (migrate_flat_layout) может перенести файл в шард между
+    проверкой и открытием, поэтому наличие файлов не проверяется заранее:
+    каждый путь открывается напрямую, а после неудачи по всем путям шард
+    проверяется ещё раз.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+
+    Returns
+    -------
+    UserRecord
+        Объект, содержащий информацию о пользователе.
+
+    Raises
+    ------
+    FileNotFoundError
+        Если профиль пользователя не найден.
+    """
+    path = _user_path(user_id, 'bin')
+
+    for _ in range(2):
+        try:
+            with open(path, 'rb') as file:
+                return UserRecord.unpack(file.read())
+        except FileNotFoundError:
+            pass
+
+        try:
+            _ensure_shard_dir(user_id)
+            if _move_to_shard(_flat_user_path(user_id, 'bin'), path):
+                _append_index([(user_id, int(os.path.getmtime(path)))])
+            continue
+        except FileNotFoundError:
+            pass
+
+        for json_path in (_flat_user_path(user_id, 'json'), _user_path(user_id, 'json')):
+            try:
+                with open(json_path, 'r', encoding='UTF-8') as file:
+                    user_data = UserRecord.from_state(UserState(**json.load(file)))
+            except FileNotFoundError:
+                continue
+
+            _write_durable(path, user_data.pack())
+            _append_index([(user_id, int(time.time()))])
+            # Файл мог быть перенесён миграцией после чтения
+            for stale_path in (_flat_user_path(user_id, 'json'), _user_path(user_id, 'json')):
+                try:
+                    os.remove(stale_path)
+                except FileNotFoundError:
+                    pass
+
+            return user_data
+
+    raise FileNotFoundError(path)
+
+
+def _event_operation(
+        user_id: int,
+        kind: int,
+        amount: int,
+        nutrients: Nutrients | None = None,
+        at: int | None = None
+) -> tuple:
+    """
+    Формирует операцию журнала для дописывания события пользователя.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+    kind : int
+        Тип события (EVENT_WATER, EVENT_FOOD или EVENT_WORKOUT).
+    amount : int
+        Количество воды в мл либо калорий в ккал.
+    nutrients : Nutrients | None
+        Пищевая ценность для событий EVENT_FOOD.
+    at : int | None
+        Время события (unix time); None — текущее.
+
+    Returns
+    -------
+    tuple
+        Операция (OP_APPEND, относительный путь, данные).
+
+    Raises
+    ------
+    RecordEncodeError
+        Если количество не помещается в запись журнала.
+    """
+    macros = nutrients[1:] if nutrients is not None else (0.0,) * 5
+    try:
+        payload = _EVENT.pack(int(time.time()) if at is None else at, kind, amount, *macros)
+    except struct.error as e:
+        raise RecordEncodeError(f'Событие не помещается в журнал: {e}') from e
+
+    return OP_APPEND, _relative_user_path(user_id, 'log'), payload
+
+
+def iter_events(user_id: int, since: int = 0):
+    """
+    Итерирует по журналу событий пользователя.
+
+    Parameters
+    ----------
+    user_id : int
+        Уникальный идентификатор пользователя.
+    since : int
+        Время (unix time), начиная с которого возвращаются события.
+
+    Yields
+    ------
+    tuple
+        Время, тип, количество и пять значений макронутриентов.
+    """
+    try:
+        with open(_user_path(user_id, 'log'), 'rb') as file:
+            while chunk := file.read(_EVENT.size * 1024):
+                chunk = chunk[:len(chunk) - len(chunk) % _EVENT.size]
+                for event in _EVENT.iter_unpack(chunk):
+                    if event[0] >= since:
+                        yield event
+    except FileNotFoundError:
+        return
+
+
+def lock_storage(blocking: bool = True) -> bool:
+    """
+    Захватывает монопольную блокировку хранилища до завершения процесса.
+
+    Блокировку держит работающий бот; административные команды проверяют её,
+    чтобы не воспроизводить журнал, в который бот продолжает писать.
+
+    Parameters
+    ----------
+    blocking : bool
+        Ждать освобождения блокировки другим процессом.
+
+    Returns
+    -------
+    bool
+        True, если блокировка захвачена; False, если её держит другой процесс.
+    """
+    global _lock_file
+
+    if _lock_file is not None:
+        return True
+
+    os.makedirs(USERS_DIR, exist_ok=True)
+    file = open(LOCK_PATH, 'a')
+    try:
+        fcntl.flock(file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+    except BlockingIOError:
+        file.close()
+        return False
+
+    _lock_file = file
+
+    return True
+
+
+def recover_storage() -> int:
+    """
+    Восстанавливает записи из журнала групповой фиксации после сбоя.
+
+    Журнал воспроизводится и очищается, поэтому вызывать функцию можно только
+    под блокировкой lock_storage, когда бот не запущен другим процессом.
+
+    Returns
+    -------
+    int
+        Количество восстановленных операций.
+    """
+    os.makedirs(USERS_DIR, exist_ok=True)
+    return writer.recover()
+
+
+async def close_storage() -> None:
+    """
+    Фиксирует ожидающие записи и сбрасывает состояние хранилища на диск перед остановкой бота.
+
+    Returns
+    -------
+    None
+    """
+    await writer.close()
+    await asyncio.to_thread(compact_all_indexes)
+    _user_cache.clear()
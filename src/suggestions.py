@@ -0,0 +1,228 @@
+class _Node:
+    """
+    Узел префиксного дерева: дочерние узлы, фразы, начинающиеся в узле, и лучшие фразы поддерева.
+    """
+    __slots__ = ('children', 'keys', 'top')
+
+    def __init__(self) -> None:
+        self.children = {}
+        self.keys = set()
+        self.top = []
+
+
+class PrefixIndex:
+    """
+    Префиксное дерево фраз с ранжированием по популярности.
+
+    Каждый узел хранит заранее отсортированный список лучших фраз своего поддерева,
+    поэтому поиск по префиксу занимает O(длина префикса) и не зависит от размера словаря.
+    Фраза из нескольких слов находится по началу любого из слов.
+
+    Parameters
+    ----------
+    limit : int
+        Количество лучших фраз, хранимых в каждом узле.
+    """
+    def __init__(self, limit: int = 20) -> None:
+        self.limit = limit
+        self._root = _Node()
+        self._scores = {}
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def __contains__(self, key: tuple) -> bool:
+        return key in self._scores
+
+    @staticmethod
+    def _prefixes(phrase: str) -> list:
+        """
+        Возвращает суффиксы фразы, начинающиеся с каждого слова.
+
+        Parameters
+        ----------
+        phrase : str
+            Фраза.
+
+        Returns
+        -------
+        list
+            Суффиксы фразы.
+        """
+        words = phrase.split()
+        return [' '.join(words[i:]) for i in range(len(words))]
+
+    def _rank(self, key: tuple) -> tuple:
+        """
+        Ключ сортировки: сначала популярные, затем короткие фразы.
+        """
+        return -self._scores[key], len(key[1]), key
+
+    def _path(self, text: str, create: bool = False) -> list:
+        """
+        Возвращает узлы на пути от корня по символам текста.
+
+        Parameters
+        ----------
+        text : str
+            Текст.
+        create : bool
+            Создавать отсутствующие узлы.
+
+        Returns
+        -------
+        list
+            Узлы пути (короче текста, если путь оборвался и create=False).
+        """
+        node = self._root
+        path = [node]
+        for char in text:
+            child = node.children.get(char)
+            if child is None:
+                if not create:
+                    break
+                child = node.children[char] = _Node()
+            node = child
+            path.append(node)
+
+        return path
+
+    def _refresh(self, path: list) -> None:
+        """
+        Пересчитывает лучшие фразы узлов пути снизу вверх.
+
+        Parameters
+        ----------
+        path : list
+            Узлы пути от корня.
+
+        Returns
+        -------
+        None
+        """
+        for node in reversed(path):
+            candidates = set(node.keys)
+            for child in node.children.values():
+                candidates.update(child.top)
+            node.top = sorted(candidates, key=self._rank)[:self.limit]
+
+    def update(self, key: tuple, score: int) -> None:
+        """
+        Добавляет фразу либо обновляет её популярность.
+
+        Parameters
+        ----------
+        key : tuple
+            Ключ (kind, фраза).
+        score : int
+            Популярность фразы (число обращений).
+
+        Returns
+        -------
+        None
+        """
+        previous = self._scores.get(key)
+        self._scores[key] = score
+
+        for suffix in self._prefixes(key[1]):
+            path = self._path(suffix, create=previous is None)
+            if previous is None:
+                path[-1].keys.add(key)
+
+            if previous is None or score < previous:
+                self._refresh(path)
+                continue
+
+            # Рост популярности только поднимает фразу: достаточно вставить её в списки узлов пути
+            rank = self._rank(key)
+            for node in path:
+                if key in node.top:
+                    node.top.sort(key=self._rank)
+                elif len(node.top) < self.limit or rank < self._rank(node.top[-1]):
+                    node.top.append(key)
+                    node.top.sort(key=self._rank)
+                    del node.top[self.limit:]
+
+    def extend(self, items) -> None:
+        """
+        Добавляет фразы пачкой с однократным пересчётом всего дерева.
+
+        Parameters
+        ----------
+        items : Iterable
+            Пары (ключ (kind, фраза), популярность).
+
+        Returns
+        -------
+        None
+        """
+        for key, score in items:
+            known = key in self._scores
+            self._scores[key] = score
+            if not known:
+                for suffix in self._prefixes(key[1]):
+                    self._path(suffix, create=True)[-1].keys.add(key)
+
+        self._refresh_subtree(self._root)
+
+    def _refresh_subtree(self, node: _Node) -> None:
+        """
+        Пересчитывает лучшие фразы всех узлов поддерева.
+
+        Parameters
+        ----------
+        node : _Node
+            Корень поддерева.
+
+        Returns
+        -------
+        None
+        """
+        for child in node.children.values():
+            self._refresh_subtree(child)
+        self._refresh([node])
+
+    def remove(self, key: tuple) -> None:
+        """
+        Удаляет фразу из дерева.
+
+        Parameters
+        ----------
+        key : tuple
+            Ключ (kind, фраза).
+
+        Returns
+        -------
+        None
+        """
+        if key not in self._scores:
+            return
+
+        for suffix in self._prefixes(key[1]):
+            path = self._path(suffix)
+            path[-1].keys.discard(key)
+            self._refresh(path)
+
+        del self._scores[key]
+
+    def search(self, prefix: str, limit: int = 10) -> list:
+        """
+        Возвращает самые популярные фразы, начинающиеся с префикса.
+
+        Parameters
+        ----------
+        prefix : str
+            Префикс (в нижнем регистре).
+        limit : int
+            Максимальное количество результатов.
+
+        Returns
+        -------
+        list
+            Пары (ключ, популярность).
+        """
+        path = self._path(prefix)
+        if len(path) != len(prefix) + 1:
+            return []
+
+        return [(key, self._scores[key]) for key in path[-1].top[:limit]]
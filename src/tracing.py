@@ -0,0 +1,174 @@
+import os
+import json
+import time
+import inspect
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from config.conifg import DIAGNOSTICS_DIR, TRACE_SLOW_THRESHOLD_MS
+
+
+TRACES_PATH = f'{DIAGNOSTICS_DIR}/traces.jsonl'
+
+_current_span = ContextVar('current_span', default=None)
+
+
+class Span:
+    """
+    Участок обработки обновления с временем начала, длительностью и дочерними участками.
+    """
+    __slots__ = ('name', 'attributes', 'start', 'end', 'children')
+
+    def __init__(self, name: str, attributes: dict) -> None:
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    @property
+    def duration_ms(self) -> float:
+        """
+        Длительность участка в миллисекундах.
+        """
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: float) -> dict:
+        """
+        Преобразует участок и его дочерние участки в словарь для экспорта.
+
+        Parameters
+        ----------
+        origin : float
+            Время начала корневого участка.
+
+        Returns
+        -------
+        dict
+            Представление участка.
+        """
+        return {
+            'name': self.name,
+            'offset_ms': round((self.start - origin) * 1000, 2),
+            'duration_ms': round(self.duration_ms, 2),
+            **({'attributes': self.attributes} if self.attributes else {}),
+            **({'children': [child.to_dict(origin) for child in self.children]} if self.children else {})
+        }
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """
+    Открывает дочерний участок текущей трассировки.
+
+    Вне трассировки (например, в фоновых задачах) ничего не делает.
+
+    Parameters
+    ----------
+    name : str
+        Название участка.
+    **attributes
+        Дополнительные атрибуты участка.
+
+    Yields
+    ------
+    Span | None
+        Открытый участок либо None.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+
+    child = Span(name, attributes)
+    parent.children.append(child)
+    token = _current_span.set(child)
+    try:
+        yield child
+    finally:
+        child.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """
+    Открывает корневой участок трассировки обновления.
+
+    Если обработка длилась дольше TRACE_SLOW_THRESHOLD_MS, трассировка целиком
+    записывается в diagnostics/traces.jsonl, иначе отбрасывается.
+
+    Parameters
+    ----------
+    name : str
+        Название трассировки.
+    **attributes
+        Дополнительные атрибуты трассировки.
+
+    Yields
+    ------
+    Span
+        Корневой участок.
+    """
+    root = Span(name, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+
+        if root.duration_ms >= TRACE_SLOW_THRESHOLD_MS:
+            export_trace(root)
+
+
+def export_trace(root: Span) -> None:
+    """
+    Дописывает трассировку в файл diagnostics/traces.jsonl.
+
+    Parameters
+    ----------
+    root : Span
+        Корневой участок трассировки.
+
+    Returns
+    -------
+    None
+    """
+    os.makedirs(DIAGNOSTICS_DIR, exist_ok=True)
+    record = {'timestamp': time.time(), **root.to_dict(root.start)}
+
+    with open(TRACES_PATH, 'a', encoding='UTF-8') as file:
+        file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+def traced(name: str):
+    """
+    Декоратор, оборачивающий вызов функции (обычной или асинхронной) в участок трассировки.
+
+    Parameters
+    ----------
+    name : str
+        Название участка.
+
+    Returns
+    -------
+    Callable
+        Декоратор.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorator
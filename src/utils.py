@@ -1,45 +1,86 @@
 import json
+import time
+import asyncio
 import aiohttp
-from googletrans import Translator
-from config.conifg import PYTHONPATH
-from src.states import UserState
+from collections import Counter
+from config.conifg import WEATHER_REFRESH_INTERVAL, WEATHER_RESEED_INTERVAL
+from src.language import needs_translation, translate_tokens, join_tokens
+from src.middlewares import logger
+from src.states import Nutrients
+from src.storage import iter_tenants, iter_user_records, use_tenant
+from src.tracing import traced
+from src.weather import weather_cache
 
 
-def save_user_data(user_data: UserState) -> None:
+# Общая сессия с пулом соединений для всех внешних API
+_session = None
+# Общий клиент переводчика Google (собственный пул соединений httpx и токен)
+_translator = None
+
+
+class TranslatorError(Exception):
+    """
+    Ошибка обращения к переводчику Google.
     """
-    Сохраняет информацию о пользователе в JSON-файл.
 
-    Parameters
-    ----------
-    user_data : UserState
-        Объект, содержащий информацию о пользователе.
+
+# Временные сбои внешних API: запрос имеет смысл повторить позже
+UPSTREAM_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, TranslatorError)
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую HTTP-сессию, создавая её при первом обращении.
 
     Returns
     -------
-    None
+    aiohttp.ClientSession
+        HTTP-сессия.
+    """
+    global _session
+
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession()
+
+    return _session
+
+
+def get_translator():
     """
-    with open(f'{PYTHONPATH}/users/{user_data.user_id}.json', 'w', encoding='UTF-8') as file:
-        json.dump(user_data.__dict__, file)
+    Возвращает общий клиент переводчика, создавая его при первом переводе.
 
+    googletrans тянет httpx/h2, поэтому импортируется только здесь.
 
-def load_user_data(user_id: int) -> UserState:
+    Returns
+    -------
+    googletrans.Translator
+        Клиент переводчика.
     """
-    Загружает информацию о пользователе из JSON-файла.
+    global _translator
+
+    if _translator is None:
+        from googletrans import Translator
+        _translator = Translator()
+
+    return _translator
 
-    Parameters
-    ----------
-    user_id : int
-        Уникальный идентификатор пользователя.
+
+async def close_session() -> None:
+    """
+    Закрывает общую HTTP-сессию и клиент переводчика.
 
     Returns
     -------
-    UserState
-        Объект, содержащий информацию о пользователе.
+    None
     """
-    with open(f'{PYTHONPATH}/users/{user_id}.json', 'r', encoding='UTF-8') as file:
-        user_data_json = json.load(file)
-        user_data = UserState(**user_data_json)
-        return user_data
+    global _translator
+
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+    if _translator is not None:
+        await _translator.client.aclose()
+        _translator = None
 
 
 def mifflin_st_jeor(
@@ -83,10 +124,39 @@ def mifflin_st_jeor(
     return bmr
 
 
+@traced('get_temperature')
 async def get_temperature(city: str, api_key: str) -> float:
     """
     Получает текущую температуру для указанного города с использованием API OpenWeatherMap.
 
+    Значение берётся из кэша, который фоново обновляется задачей refresh_weather_cache.
+
+    Parameters
+    ----------
+    city : str
+        Название города.
+    api_key : str
+        Ключ API для доступа к OpenWeatherMap.
+
+    Returns
+    -------
+    float
+        Температура в указанном городе в градусах Цельсия.
+    """
+    temperature = weather_cache.get(city)
+    if temperature is None:
+        temperature = await fetch_temperature(city=city, api_key=api_key)
+
+    # Город учитывается только после успешного ответа, чтобы опечатки не обновлялись фоново
+    weather_cache.track(city)
+
+    return temperature
+
+
+async def fetch_temperature(city: str, api_key: str) -> float:
+    """
+    Запрашивает температуру в городе у OpenWeatherMap и сохраняет её в кэш.
+
     Parameters
     ----------
     city : str
@@ -106,14 +176,122 @@ async def get_temperature(city: str, api_key: str) -> float:
         'units': 'metric'
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url=base_url, params=params) as response:
-            response_data = await response.text()
-            temperature = json.loads(response_data)['main']['temp']
+    async with get_session().get(url=base_url, params=params) as response:
+        if response.status >= 500 or response.status == 429:
+            response.raise_for_status()
+        response_data = await response.text()
+        weather = json.loads(response_data)
+        temperature = weather['main']['temp']
+
+    weather_cache.put(city, temperature, weather.get('id'))
 
     return temperature
 
 
+async def get_group_temperatures(city_ids: list, api_key: str) -> dict:
+    """
+    Получает температуру сразу для нескольких городов одним запросом к OpenWeatherMap.
+
+    Parameters
+    ----------
+    city_ids : list
+        ID городов в OpenWeatherMap (не более 20).
+    api_key : str
+        Ключ API для доступа к OpenWeatherMap.
+
+    Returns
+    -------
+    dict
+        Словарь ID города -> температура в градусах Цельсия.
+    """
+    base_url = 'https://api.openweathermap.org/data/2.5/group?'
+    params = {
+        'id': ','.join(str(city_id) for city_id in city_ids),
+        'appid': api_key,
+        'units': 'metric'
+    }
+
+    async with get_session().get(url=base_url, params=params) as response:
+        response.raise_for_status()
+        weather = await response.json()
+
+    return {city['id']: city['main']['temp'] for city in weather['list']}
+
+
+def _count_user_cities() -> Counter:
+    """
+    Подсчитывает пользователей по городам во всех пространствах имён ботов.
+
+    Returns
+    -------
+    Counter
+        Количество пользователей в каждом городе.
+    """
+    cities = Counter()
+    for tenant in iter_tenants():
+        with use_tenant(tenant):
+            cities.update(user.city for user in iter_user_records())
+
+    return cities
+
+
+async def refresh_weather_cache(api_key: str) -> None:
+    """
+    Фоново обновляет температуру в городах пользователей до истечения TTL кэша.
+
+    Города с известным ID обновляются групповыми запросами, популярные города — первыми.
+    Города пользователей периодически пересчитываются по хранилищу, неизвестные
+    OpenWeatherMap города и города без обращений перестают обновляться.
+
+    Parameters
+    ----------
+    api_key : str
+        Ключ API для доступа к OpenWeatherMap.
+
+    Returns
+    -------
+    None
+    """
+    reseeded = None
+
+    while True:
+        if reseeded is None or time.monotonic() - reseeded >= WEATHER_RESEED_INTERVAL:
+            weather_cache.reseed(await asyncio.to_thread(_count_user_cities))
+            reseeded = time.monotonic()
+
+        due = weather_cache.due_cities()
+        grouped = {weather_cache.city_id(city): city for city in due if weather_cache.city_id(city)}
+        city_ids = list(grouped)
+        refreshed = set()
+
+        for i in range(0, len(city_ids), 20):
+            batch = city_ids[i:i + 20]
+            try:
+                temperatures = await get_group_temperatures(city_ids=batch, api_key=api_key)
+            except (aiohttp.ClientError, asyncio.TimeoutError, KeyError, ValueError) as e:
+                logger.warning(f'Групповое обновление погоды не удалось: {e!r}')
+                continue
+
+            for city_id, temperature in temperatures.items():
+                if city_id in grouped:
+                    weather_cache.put(grouped[city_id], temperature, city_id)
+                    refreshed.add(grouped[city_id])
+
+        for city in due:
+            if city in refreshed:
+                continue
+            try:
+                await fetch_temperature(city=city, api_key=api_key)
+            except KeyError:
+                # OpenWeatherMap не знает город: он вернётся после пересчёта по хранилищу либо успешного запроса
+                logger.warning(f'Город {city} не найден, фоновое обновление погоды для него остановлено')
+                weather_cache.forget(city)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                logger.warning(f'Не удалось обновить погоду для города {city}: {e!r}')
+
+        await asyncio.sleep(WEATHER_REFRESH_INTERVAL)
+
+
 def calculate_water_intake(sex: str, weight: int, activity_level: int) -> int:
     """
     Рассчитывает дневную норму потребления воды для пользователя.
@@ -145,9 +323,10 @@ def calculate_water_intake(sex: str, weight: int, activity_level: int) -> int:
     return water_intake
 
 
-async def get_nutritionix(query: str, application_id: str, api_key: str) -> int:
+@traced('get_nutritionix')
+async def get_nutritionix(query: str, application_id: str, api_key: str) -> Nutrients:
     """
-    Получает информацию о калориях на основании запроса, используя API Nutritionix.
+    Получает информацию о калориях и макронутриентах на основании запроса, используя API Nutritionix.
 
     Parameters
     ----------
@@ -160,8 +339,8 @@ async def get_nutritionix(query: str, application_id: str, api_key: str) -> int:
 
     Returns
     -------
-    int
-        Количество калорий для указанного запроса.
+    Nutrients
+        Калории и макронутриенты для указанного запроса.
     """
     base_url = 'https://trackapi.nutritionix.com/v2/natural/nutrients'
     body = {
@@ -173,14 +352,25 @@ async def get_nutritionix(query: str, application_id: str, api_key: str) -> int:
         'x-app-key': api_key
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.post(url=base_url, headers=headers, json=body) as response:
-            nutritionix = await response.json()
-            calories = int(nutritionix['foods'][0]['nf_calories'])
-
-    return calories
-
-
+    async with get_session().post(url=base_url, headers=headers, json=body) as response:
+        # Перегрузка и сбои сервиса — временная ошибка, а не «еда не найдена»
+        if response.status >= 500 or response.status == 429:
+            response.raise_for_status()
+        nutritionix = await response.json()
+        food = nutritionix['foods'][0]
+        nutrients = Nutrients(
+            calories=int(food['nf_calories']),
+            protein=food.get('nf_protein') or 0.0,
+            fat=food.get('nf_total_fat') or 0.0,
+            carbohydrates=food.get('nf_total_carbohydrate') or 0.0,
+            fiber=food.get('nf_dietary_fiber') or 0.0,
+            sugar=food.get('nf_sugars') or 0.0
+        )
+
+    return nutrients
+
+
+@traced('get_workout')
 async def get_workout(activity: str, weight: int, duration: int, api_key: str) -> int:
     """
     Получает информацию о количестве сожжённых калорий на основе активности, веса и длительности.
@@ -211,18 +401,24 @@ async def get_workout(activity: str, weight: int, duration: int, api_key: str) -
         'X-Api-Key': api_key
     }
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url=base_url, headers=headers, params=params) as response:
-            workout = await response.json()
-            burned_calories = int(workout[0]['total_calories'])
+    async with get_session().get(url=base_url, headers=headers, params=params) as response:
+        if response.status >= 500 or response.status == 429:
+            response.raise_for_status()
+        workout = await response.json()
+        burned_calories = int(workout[0]['total_calories'])
 
     return burned_calories
 
 
+@traced('translate_query')
 async def translate_query(query: str) -> str:
     """
     Переводит запрос с русского языка на английский.
 
+    Английский и числовой ввод возвращается без обращения к переводчику.
+    Известные слова переводятся по локальному словарю, в Google отправляются
+    только оставшиеся группы русских слов — все группы одним запросом.
+
     Parameters
     ----------
     query : str
@@ -232,10 +428,48 @@ async def translate_query(query: str) -> str:
     -------
     str
         Переведённый запрос на английский язык.
-    """
-    async with Translator() as translator:
-        translated_query = await translator.translate(query, src='ru', dest='en')
 
-    translated_query = translated_query.text
+    Raises
+    ------
+    TranslatorError
+        Если переводчик недоступен.
+    """
+    if not needs_translation(query):
+        return query
+
+    tokens, unknown = translate_tokens(query)
+
+    if not unknown:
+        return join_tokens(tokens)
+
+    # Группируем соседние непереведённые токены, чтобы сохранить контекст фразы
+    runs = []
+    for i in unknown:
+        if runs and runs[-1][-1] == i - 1:
+            runs[-1].append(i)
+        else:
+            runs.append([i])
+
+    phrases = [' '.join(tokens[i] for i in run) for run in runs]
+
+    try:
+        translator = get_translator()
+        # Группы переводятся одним запросом по строке на группу: переводчик сохраняет переводы строк
+        translated = await translator.translate('\n'.join(phrases), src='ru', dest='en')
+        translated_phrases = [line.strip() for line in translated.text.split('\n')]
+
+        if len(translated_phrases) != len(phrases):
+            # Строки склеились при переводе: группы переводятся отдельно по общему соединению
+            translated_phrases = [result.text for result in await translator.translate(phrases, src='ru', dest='en')]
+    except Exception as e:
+        # googletrans падает как ошибками httpx, так и ошибками разбора ответа
+        raise TranslatorError(str(e)) from e
+
+    for run, translated_phrase in zip(runs, translated_phrases):
+        tokens[run[0]] = translated_phrase
+        for i in run[1:]:
+            tokens[i] = ''
+
+    translated_query = join_tokens([token for token in tokens if token])
 
     return translated_query
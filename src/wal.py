@@ -0,0 +1,418 @@
+import os
+import zlib
+import struct
+import asyncio
+from collections import deque
+from loguru import logger
+
+
+# Запись журнала: CRC32, операция, смещение, длина пути, длина данных
+_RECORD = struct.Struct('<IBQHI')
+OP_REPLACE = 0
+OP_APPEND = 1
+
+
+class GroupCommitWriter:
+    """
+    Групповая фиксация записей через журнал упреждающей записи (WAL).
+
+    Операции, поступившие за короткое окно, одной записью дописываются в журнал
+    с единственным fsync, после чего применяются к файлам. Ожидающие обработчики
+    освобождаются только после fsync журнала. Файлы синхронизируются с диском
+    при контрольной точке, после которой журнал очищается.
+
+    Запись, попавшая в журнал, считается зафиксированной: если применить её
+    к файлам не удалось (нет места, нет прав), обработчик всё равно получает
+    успех, запись остаётся в журнале и применяется повторно при следующей
+    фиксации либо контрольной точке, а до тех пор читается через pending.
+
+    Parameters
+    ----------
+    root : str
+        Корневая директория, относительно которой заданы пути файлов.
+    wal_path : str
+        Путь к файлу журнала.
+    window : float
+        Окно накопления операций в секундах.
+    checkpoint_bytes : int
+        Размер журнала, при котором выполняется контрольная точка.
+    on_commit : Callable | None
+        Функция, вызываемая в потоке записи со списком применённых операций.
+    """
+    def __init__(
+            self,
+            root: str,
+            wal_path: str,
+            window: float,
+            checkpoint_bytes: int,
+            on_commit=None
+    ) -> None:
+        self.root = root
+        self.wal_path = wal_path
+        self.window = window
+        self.checkpoint_bytes = checkpoint_bytes
+        self.on_commit = on_commit
+
+        self._batch = []
+        self._flusher = None
+        self._unapplied = {}
+        self._dirty = set()
+        self._dirs = set()
+        self._wal_size = 0
+        # Записи журнала, которые ещё не удалось применить к файлам, в порядке фиксации
+        self._unapplied_records = deque()
+        # Содержимое pending, снятие которого отложено до применения записей: путь -> данные
+        self._deferred_pending = {}
+        self._wal_dir_synced = False
+
+        self.commits = 0
+        self.records = 0
+
+    async def write(self, operations: list) -> None:
+        """
+        Ставит операции в текущую группу и ждёт их фиксации на диске.
+
+        Parameters
+        ----------
+        operations : list
+            Список кортежей (операция, относительный путь, данные).
+
+        Returns
+        -------
+        None
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._batch.append((operations, future))
+
+        for op, path, payload in operations:
+            if op == OP_REPLACE:
+                self._unapplied[path] = payload
+
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush())
+
+        await future
+
+    def pending(self, path: str) -> bytes | None:
+        """
+        Возвращает последнее ещё не применённое содержимое файла.
+
+        Parameters
+        ----------
+        path : str
+            Относительный путь к файлу.
+
+        Returns
+        -------
+        bytes | None
+            Содержимое файла либо None.
+        """
+        return self._unapplied.get(path)
+
+    async def _flush(self) -> None:
+        """
+        Фиксирует накопленные группы операций, пока очередь не опустеет.
+
+        Returns
+        -------
+        None
+        """
+        await asyncio.sleep(self.window)
+
+        while self._batch:
+            batch, self._batch = self._batch, []
+            operations = [operation for operations, _ in batch for operation in operations]
+
+            try:
+                await asyncio.to_thread(self._commit, operations)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_result(None)
+
+            # Содержимое, которое ещё не применено к файлам, остаётся доступным через pending
+            retry_paths = {path for _, _, path, _ in self._unapplied_records}
+            for op, path, payload in operations:
+                if op == OP_REPLACE:
+                    self._deferred_pending[path] = payload
+
+            for path, payload in list(self._deferred_pending.items()):
+                if path in retry_paths:
+                    continue
+                if self._unapplied.get(path) is payload:
+                    del self._unapplied[path]
+                del self._deferred_pending[path]
+
+    def _commit(self, operations: list) -> None:
+        """
+        Дописывает операции в журнал, выполняет fsync и применяет их к файлам.
+
+        Parameters
+        ----------
+        operations : list
+            Список кортежей (операция, относительный путь, данные).
+
+        Returns
+        -------
+        None
+        """
+        records = []
+        # Дописывания, ещё не применённые к файлам, сдвигают смещение следующих
+        sizes = {
+            path: offset + len(payload)
+            for op, offset, path, payload in self._unapplied_records
+            if op == OP_APPEND
+        }
+
+        for op, path, payload in operations:
+            offset = 0
+            if op == OP_APPEND:
+                offset = sizes.get(path)
+                if offset is None:
+                    offset = self._file_size(path)
+                sizes[path] = offset + len(payload)
+            records.append((op, offset, path, payload))
+
+        data = b''.join(self._encode(*record) for record in records)
+        with open(self.wal_path, 'ab') as wal:
+            start = wal.tell()
+            try:
+                wal.write(data)
+                wal.flush()
+                os.fsync(wal.fileno())
+            except OSError:
+                # Обработчики получат ошибку, поэтому недописанная группа не должна восстановиться
+                wal.truncate(start)
+                raise
+
+        if not self._wal_dir_synced:
+            # Созданный файл журнала должен пережить сбой вместе с записью о нём в директории
+            self._fsync_path(os.path.dirname(self.wal_path))
+            self._wal_dir_synced = True
+
+        self._wal_size += len(data)
+        self.commits += 1
+        self.records += len(records)
+
+        # С этого момента записи зафиксированы: ошибка применения не возвращается обработчикам
+        self._unapplied_records.extend(records)
+        try:
+            self._apply_pending()
+        except OSError as e:
+            logger.warning(f'Не удалось применить {len(self._unapplied_records)} записей журнала: {e!r}')
+
+        if self.on_commit is not None:
+            self.on_commit(operations)
+
+        if self._wal_size >= self.checkpoint_bytes and not self._unapplied_records:
+            self.checkpoint()
+
+    def _apply_pending(self) -> None:
+        """
+        Применяет к файлам зафиксированные записи журнала по порядку.
+
+        Применённые записи снимаются с очереди; на первой ошибке применение
+        останавливается, и оставшиеся записи ждут следующей попытки.
+
+        Returns
+        -------
+        None
+        """
+        while self._unapplied_records:
+            self._apply(*self._unapplied_records[0])
+            self._unapplied_records.popleft()
+
+    @staticmethod
+    def _fsync_path(path: str) -> None:
+        """
+        Синхронизирует файл либо директорию с диском.
+
+        Parameters
+        ----------
+        path : str
+            Путь к файлу либо директории.
+
+        Returns
+        -------
+        None
+        """
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _encode(op: int, offset: int, path: str, payload: bytes) -> bytes:
+        """
+        Кодирует операцию в запись журнала.
+
+        Parameters
+        ----------
+        op : int
+            Операция (OP_REPLACE или OP_APPEND).
+        offset : int
+            Смещение в файле для OP_APPEND.
+        path : str
+            Относительный путь к файлу.
+        payload : bytes
+            Данные.
+
+        Returns
+        -------
+        bytes
+            Запись журнала.
+        """
+        path_bytes = path.encode('UTF-8')
+        record = _RECORD.pack(0, op, offset, len(path_bytes), len(payload))[4:] + path_bytes + payload
+
+        return struct.pack('<I', zlib.crc32(record)) + record
+
+    def _file_size(self, path: str) -> int:
+        """
+        Возвращает текущий размер файла (0, если файла нет).
+
+        Parameters
+        ----------
+        path : str
+            Относительный путь к файлу.
+
+        Returns
+        -------
+        int
+            Размер файла в байтах.
+        """
+        try:
+            return os.path.getsize(os.path.join(self.root, path))
+        except FileNotFoundError:
+            return 0
+
+    def _apply(self, op: int, offset: int, path: str, payload: bytes) -> None:
+        """
+        Применяет операцию к файлу. Повторное применение безопасно.
+
+        Parameters
+        ----------
+        op : int
+            Операция (OP_REPLACE или OP_APPEND).
+        offset : int
+            Смещение в файле для OP_APPEND.
+        path : str
+            Относительный путь к файлу.
+        payload : bytes
+            Данные.
+
+        Returns
+        -------
+        None
+        """
+        full_path = os.path.join(self.root, path)
+        directory = os.path.dirname(full_path)
+        if directory not in self._dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._dirs.add(directory)
+
+        if op == OP_REPLACE:
+            tmp_path = f'{full_path}.tmp'
+            with open(tmp_path, 'wb') as file:
+                file.write(payload)
+            os.replace(tmp_path, full_path)
+        else:
+            fd = os.open(full_path, os.O_WRONLY | os.O_CREAT, 0o644)
+            try:
+                # Обрезаем хвост, дописанный до сбоя, чтобы повторное применение не дублировало данные
+                os.ftruncate(fd, offset)
+                os.pwrite(fd, payload, offset)
+            finally:
+                os.close(fd)
+
+        self._dirty.add(full_path)
+
+    def checkpoint(self) -> None:
+        """
+        Синхронизирует изменённые файлы с диском и очищает журнал.
+
+        Журнал очищается только после того, как все зафиксированные записи
+        применены к файлам.
+
+        Returns
+        -------
+        None
+
+        Raises
+        ------
+        OSError
+            Если записи журнала по-прежнему не удаётся применить; журнал не очищается.
+        """
+        self._apply_pending()
+
+        directories = set()
+        for path in self._dirty:
+            self._fsync_path(path)
+            directories.add(os.path.dirname(path))
+
+        for directory in directories:
+            self._fsync_path(directory)
+
+        with open(self.wal_path, 'wb') as wal:
+            os.fsync(wal.fileno())
+
+        self._dirty.clear()
+        self._wal_size = 0
+
+    def recover(self) -> int:
+        """
+        Повторно применяет операции из журнала после сбоя.
+
+        Чтение останавливается на первой повреждённой (не дописанной) записи.
+
+        Returns
+        -------
+        int
+            Количество восстановленных операций.
+        """
+        try:
+            with open(self.wal_path, 'rb') as wal:
+                data = wal.read()
+        except FileNotFoundError:
+            return 0
+
+        recovered = []
+        position = 0
+
+        while position + _RECORD.size <= len(data):
+            crc, op, offset, path_length, payload_length = _RECORD.unpack_from(data, position)
+            start = position + _RECORD.size
+            end = start + path_length + payload_length
+            if end > len(data) or zlib.crc32(data[position + 4:end]) != crc:
+                break
+
+            path = data[start:start + path_length].decode('UTF-8')
+            payload = data[start + path_length:end]
+            self._apply(op, offset, path, payload)
+            recovered.append((op, path, payload))
+            position = end
+
+        if recovered and self.on_commit is not None:
+            self.on_commit(recovered)
+
+        self.checkpoint()
+
+        return len(recovered)
+
+    async def close(self) -> None:
+        """
+        Дожидается фиксации всех операций и выполняет контрольную точку.
+
+        Returns
+        -------
+        None
+        """
+        while self._flusher is not None and not self._flusher.done():
+            await self._flusher
+
+        await asyncio.to_thread(self.checkpoint)
@@ -0,0 +1,194 @@
+import time
+from collections import Counter
+from config.conifg import WEATHER_TTL, WEATHER_REFRESH_MARGIN, WEATHER_POPULARITY_TTL
+
+
+class WeatherCache:
+    """
+    Кэш температуры по городам с учётом популярности городов.
+
+    Parameters
+    ----------
+    ttl : int
+        Время жизни значения температуры в секундах.
+    refresh_margin : int
+        За сколько секунд до истечения TTL значение считается требующим обновления.
+    popularity_ttl : int
+        Через сколько секунд без обращений город перестаёт обновляться.
+    """
+    def __init__(self, ttl: int, refresh_margin: int, popularity_ttl: int) -> None:
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.popularity_ttl = popularity_ttl
+
+        # Город -> [температура, время получения]
+        self._entries = {}
+        # Город -> ID города в OpenWeatherMap
+        self._city_ids = {}
+        self._popularity = Counter()
+        # Город -> время последнего обращения
+        self._last_seen = {}
+
+    @staticmethod
+    def normalize(city: str) -> str:
+        """
+        Приводит название города к ключу кэша.
+
+        Parameters
+        ----------
+        city : str
+            Название города.
+
+        Returns
+        -------
+        str
+            Нормализованное название города.
+        """
+        return ' '.join(city.lower().split())
+
+    def track(self, city: str, weight: int = 1) -> None:
+        """
+        Учитывает обращение к городу (или пользователей из него) для приоритизации обновления.
+
+        Вызывается только для городов, температура которых успешно получена.
+
+        Parameters
+        ----------
+        city : str
+            Название города.
+        weight : int
+            Вес обращения.
+
+        Returns
+        -------
+        None
+        """
+        key = self.normalize(city)
+        self._popularity[key] += weight
+        self._last_seen[key] = time.monotonic()
+
+    def reseed(self, cities: Counter) -> None:
+        """
+        Обновляет популярность городов по числу пользователей из хранилища.
+
+        Parameters
+        ----------
+        cities : Counter
+            Количество пользователей в каждом городе.
+
+        Returns
+        -------
+        None
+        """
+        now = time.monotonic()
+        for city, users in cities.items():
+            key = self.normalize(city)
+            self._popularity[key] = max(self._popularity[key], users)
+            self._last_seen[key] = now
+
+    def forget(self, city: str) -> None:
+        """
+        Перестаёт обновлять город (например, если OpenWeatherMap его не знает).
+
+        Parameters
+        ----------
+        city : str
+            Название города.
+
+        Returns
+        -------
+        None
+        """
+        key = self.normalize(city)
+        self._popularity.pop(key, None)
+        self._last_seen.pop(key, None)
+        self._entries.pop(key, None)
+        self._city_ids.pop(key, None)
+
+    def get(self, city: str) -> float | None:
+        """
+        Возвращает температуру из кэша, если она ещё не устарела.
+
+        Parameters
+        ----------
+        city : str
+            Название города.
+
+        Returns
+        -------
+        float | None
+            Температура в градусах Цельсия либо None.
+        """
+        entry = self._entries.get(self.normalize(city))
+        if entry is None or time.monotonic() - entry[1] > self.ttl:
+            return None
+
+        return entry[0]
+
+    def put(self, city: str, temperature: float, city_id: int | None = None) -> None:
+        """
+        Сохраняет температуру в кэш.
+
+        Parameters
+        ----------
+        city : str
+            Название города.
+        temperature : float
+            Температура в градусах Цельсия.
+        city_id : int | None
+            ID города в OpenWeatherMap для группового обновления.
+
+        Returns
+        -------
+        None
+        """
+        key = self.normalize(city)
+        self._entries[key] = [temperature, time.monotonic()]
+        if city_id is not None:
+            self._city_ids[key] = city_id
+
+    def due_cities(self) -> list:
+        """
+        Возвращает города, значения которых истекают в ближайшее время.
+
+        Города без обращений дольше popularity_ttl удаляются из кэша.
+
+        Returns
+        -------
+        list
+            Города, отсортированные по убыванию популярности.
+        """
+        now = time.monotonic()
+        for city in [city for city, seen in self._last_seen.items() if now - seen > self.popularity_ttl]:
+            self.forget(city)
+
+        deadline = now - self.ttl + self.refresh_margin
+        due = [
+            city for city, _ in self._popularity.most_common()
+            if city not in self._entries or self._entries[city][1] <= deadline
+        ]
+
+        return due
+
+    def city_id(self, city: str) -> int | None:
+        """
+        Возвращает ID города в OpenWeatherMap, если он известен.
+
+        Parameters
+        ----------
+        city : str
+            Название города.
+
+        Returns
+        -------
+        int | None
+            ID города либо None.
+        """
+        return self._city_ids.get(self.normalize(city))
+
+
+weather_cache = WeatherCache(
+    ttl=WEATHER_TTL,
+    refresh_margin=WEATHER_REFRESH_MARGIN,
+    popularity_ttl=WEATHER_POPULARITY_TTL
+)